@@ -0,0 +1,102 @@
+"""
+历史记录分页查询基准测试：LIMIT/OFFSET 翻页 vs query_history 键集分页
+
+在临时数据库中写入大量记录（分属多次运行），测量翻到深处的一页、按运行筛选、按时间筛选、
+按状态筛选时每页的耗时；写入线程同时持续记录新行，查询走独立的只读连接不会与其争用。
+
+用法: python benchmarks/bench_history_query.py [行数]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.db_manager import DBManager, HistoryFilter
+
+ROW_COUNT = 1_000_000
+ROWS_PER_RUN = 5_000
+PAGE_SIZE = 100
+REPEAT = 20
+
+
+def populate(db, count):
+    """直接批量插入，模拟多次运行累积的历史（每 97 行一条失败记录）"""
+    start_ts = int(time.time()) - count
+    rows = []
+    for i in range(count):
+        run_id = i // ROWS_PER_RUN + 1
+        status = "FAIL: 磁盘已满" if i % 97 == 0 else "SUCCESS"
+        rows.append((start_ts + i, run_id, 1, 1, f"file_{i}.zip", f"/src/file_{i}.zip",
+                     f"/dst/03_压缩文件/file_{i}.zip", status))
+        if len(rows) >= 50_000:
+            db.cursor.executemany('''
+                INSERT INTO history (ts, run_id, action_code, type_code, filename, source_path, dest_path, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            rows = []
+    if rows:
+        db.cursor.executemany('''
+            INSERT INTO history (ts, run_id, action_code, type_code, filename, source_path, dest_path, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    db.conn.commit()
+    return start_ts
+
+
+def timed(label, fn):
+    fn()  # 预热
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        n = fn()
+    elapsed = (time.perf_counter() - start) / REPEAT * 1000
+    print(f"  {label:<28} {elapsed:8.2f} ms/页  ({n} 行)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ROW_COUNT
+    root = tempfile.mkdtemp(prefix="bench_query_")
+    db = DBManager(os.path.join(root, "history.db"), root)
+    stop = threading.Event()
+    try:
+        print(f"写入 {count} 行 ...")
+        start_ts = populate(db, count)
+        deep_id = count - count // 10  # 深处的一页（跳过 90% 的记录）
+
+        # 查询期间写入线程持续记录新行
+        def keep_logging():
+            i = 0
+            while not stop.is_set():
+                db.log("整理", "文件", f"live_{i}.zip", "/src", "/dst")
+                i += 1
+                time.sleep(0.0005)
+        logger = threading.Thread(target=keep_logging, daemon=True)
+        logger.start()
+
+        reader = db._read_connection()
+        print("LIMIT/OFFSET 翻页:")
+        timed("第 90% 处的一页", lambda: len(reader.execute(
+            "SELECT * FROM history ORDER BY id LIMIT ? OFFSET ?", (PAGE_SIZE, deep_id)).fetchall()))
+        reader.close()
+
+        print("query_history 键集分页:")
+        timed("第 90% 处的一页", lambda: len(list(db.query_history(after_id=deep_id, limit=PAGE_SIZE))))
+        timed("最新的一页（倒序）", lambda: len(list(db.query_history(limit=PAGE_SIZE, descending=True))))
+        last_run = count // ROWS_PER_RUN
+        timed("按运行筛选", lambda: len(list(db.query_history(HistoryFilter(run_id=last_run), limit=PAGE_SIZE))))
+        timed("按时间筛选", lambda: len(list(db.query_history(
+            HistoryFilter(since=start_ts + count // 2, until=start_ts + count // 2 + 3600), limit=PAGE_SIZE))))
+        timed("全时间范围第 90% 处的一页", lambda: len(list(db.query_history(
+            HistoryFilter(since=start_ts, until=start_ts + count), after_id=deep_id, limit=PAGE_SIZE))))
+        timed("按状态筛选（失败）", lambda: len(list(db.query_history(HistoryFilter(status="FAIL"), limit=PAGE_SIZE))))
+    finally:
+        stop.set()
+        db.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
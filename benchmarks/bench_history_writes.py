@@ -0,0 +1,78 @@
+"""
+历史记录写入基准测试：逐行 INSERT + commit vs 后台线程批量写入（WAL + synchronous=NORMAL）
+
+旧实现每移动一个文件就提交一次事务（默认 journal 模式下每次提交都要 fsync），
+新实现由后台线程以 executemany 每 DB_BATCH_SIZE 行或 DB_FLUSH_MS 毫秒提交一次。
+计时包含 close() 时提交剩余缓冲的时间。
+
+用法: python benchmarks/bench_history_writes.py [行数]
+"""
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.db_manager import DBManager
+
+ROW_COUNT = 20_000
+
+
+def legacy_log(conn, lock, action, item_type, filename, src, dst, status="SUCCESS"):
+    """旧实现：每行一次 INSERT 和 commit"""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with lock:
+        conn.execute('''
+            INSERT INTO history (timestamp, action, item_type, filename, source_path, dest_path, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (now, action, item_type, filename, src, dst, status))
+        conn.commit()
+
+
+def bench_legacy(db_file, count):
+    DBManager(db_file, "", batch_size=1).close()  # 建表
+    conn = sqlite3.connect(db_file, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.execute('PRAGMA synchronous=FULL')
+    lock = threading.Lock()
+    start = time.perf_counter()
+    for i in range(count):
+        legacy_log(conn, lock, "整理", "文件", f"file_{i}.zip", f"/src/file_{i}.zip", f"/dst/file_{i}.zip")
+    conn.close()
+    return time.perf_counter() - start
+
+
+def bench_buffered(db_file, count):
+    db = DBManager(db_file, "")
+    start = time.perf_counter()
+    for i in range(count):
+        db.log("整理", "文件", f"file_{i}.zip", f"/src/file_{i}.zip", f"/dst/file_{i}.zip")
+    db.close()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ROW_COUNT
+    root = tempfile.mkdtemp(prefix="bench_history_")
+    try:
+        legacy = bench_legacy(os.path.join(root, "legacy.db"), count)
+        buffered = bench_buffered(os.path.join(root, "buffered.db"), count)
+        conn = sqlite3.connect(os.path.join(root, "buffered.db"))
+        written = conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        conn.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"写入 {count} 行")
+    print(f"  逐行提交:  {legacy:8.3f} 秒  {count / legacy:10.0f} 行/秒")
+    print(f"  批量写入:  {buffered:8.3f} 秒  {count / buffered:10.0f} 行/秒  (已写入 {written} 行)")
+    print(f"  提升: {legacy / buffered:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
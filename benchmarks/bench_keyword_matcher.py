@@ -0,0 +1,62 @@
+"""
+关键词分类基准测试：逐个关键词子串匹配 vs Aho-Corasick 自动机
+
+用法: python benchmarks/bench_keyword_matcher.py
+"""
+import os
+import sys
+import time
+import random
+import string
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.organizer import KeywordStrategy
+from core.rule_index import RuleIndex
+
+FILE_COUNT = 20_000
+CATEGORY_COUNT = 20
+
+
+def random_word(rng, length):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def build_rules(rng, keywords_per_category):
+    return {
+        f"{i:02d}_分类": [random_word(rng, rng.randint(5, 10)) for _ in range(keywords_per_category)]
+        for i in range(CATEGORY_COUNT)
+    }
+
+
+def legacy_classify(filename, rules):
+    """旧实现：每个关键词都重新小写并做子串查找"""
+    for category, patterns in rules.items():
+        for pattern in patterns:
+            if pattern.lower() in filename.lower():
+                return category
+    return None
+
+
+def bench(func, names):
+    start = time.perf_counter()
+    for name in names:
+        func(name)
+    return (time.perf_counter() - start) / len(names) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    names = [f"{random_word(rng, 12)}_{random_word(rng, 8)}.dat" for _ in range(FILE_COUNT)]
+    print(f"{'关键词总数':>10} {'逐个匹配(us/文件)':>20} {'自动机(us/文件)':>18}")
+    for per_category in (5, 50, 250):
+        rules = build_rules(rng, per_category)
+        strategy = KeywordStrategy(RuleIndex(rules))
+        sample = names[:2000] if per_category > 50 else names
+        legacy = bench(lambda n: legacy_classify(n, rules), sample)
+        automaton = bench(lambda n: strategy.classify(n, rules), names)
+        print(f"{per_category * CATEGORY_COUNT:>10} {legacy:>20.2f} {automaton:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
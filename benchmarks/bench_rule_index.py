@@ -0,0 +1,57 @@
+"""
+扩展名分类基准测试：逐项扫描 vs 预编译规则索引
+
+用法: python benchmarks/bench_rule_index.py
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.organizer import ExtensionStrategy
+from core.rule_index import RuleIndex
+
+FILE_COUNT = 100_000
+
+
+def build_rules(category_count, patterns_per_category=10):
+    return {
+        f"{i:04d}_分类": [f".e{i}x{j}" for j in range(patterns_per_category)] + [f"关键词{i}"]
+        for i in range(category_count)
+    }
+
+
+def legacy_classify(filename, rules):
+    """旧实现：逐个分类做列表成员判断"""
+    ext = os.path.splitext(filename)[1].lower()
+    for category, patterns in rules.items():
+        if ext in patterns:
+            return category
+    return None
+
+
+def bench(func, names):
+    start = time.perf_counter()
+    for name in names:
+        func(name)
+    return (time.perf_counter() - start) / len(names) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'分类数':>8} {'逐项扫描(us/文件)':>20} {'规则索引(us/文件)':>20}")
+    for category_count in (20, 200, 2000):
+        rules = build_rules(category_count)
+        all_exts = [p for patterns in rules.values() for p in patterns if p.startswith('.')]
+        names = [f"file_{i}{rng.choice(all_exts)}" for i in range(FILE_COUNT)]
+
+        strategy = ExtensionStrategy(RuleIndex(rules))
+        legacy = bench(lambda n: legacy_classify(n, rules), names)
+        indexed = bench(lambda n: strategy.classify(n, rules), names)
+        print(f"{category_count:>8} {legacy:>20.2f} {indexed:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
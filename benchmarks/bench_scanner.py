@@ -0,0 +1,90 @@
+"""
+目录扫描基准测试：os.listdir + 逐项 abspath/isdir/stat vs os.scandir 扫描器
+
+在临时目录中创建 100k 个条目（含少量子目录），比较两种方式扫描并取得状态签名的耗时。
+本地磁盘上的差距主要来自 Python 层开销；在网络共享上，省掉的每次 stat 都是一次网络往返。
+
+用法: python benchmarks/bench_scanner.py [条目数]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.scanner import DirectoryScanner
+
+ENTRY_COUNT = 100_000
+DIR_EVERY = 50
+CATEGORIES = [f"{i:02d}_分类" for i in range(21)]
+
+
+def populate(root, count):
+    for i in range(count):
+        path = os.path.join(root, f"item_{i:06d}")
+        if i % DIR_EVERY == 0:
+            os.mkdir(path)
+        else:
+            open(path + ".dat", "wb").close()
+    for name in CATEGORIES + ["归档文件夹"]:
+        os.makedirs(os.path.join(root, name), exist_ok=True)
+
+
+def legacy_scan(root, exclude_paths, rules):
+    """旧实现：listdir 后逐项 join/abspath/isdir，排除列表线性查找，计划阶段再 stat 一次"""
+    items = []
+    for name in os.listdir(root):
+        source_path = os.path.join(root, name)
+        abs_path = os.path.abspath(source_path)
+        if abs_path in exclude_paths:
+            continue
+        if name in rules.keys() or name == "归档文件夹":
+            continue
+        is_dir = os.path.isdir(source_path)
+        st = os.stat(source_path)
+        items.append((name, source_path, is_dir, None if is_dir else st.st_size, st.st_mtime_ns))
+    return items
+
+
+def scandir_scan(root, exclude_paths, rules):
+    scanner = DirectoryScanner(exclude_paths, set(rules) | {"归档文件夹"})
+    items = []
+    for item in scanner.scan(root):
+        items.append((item.name, item.path, item.is_dir) + item.stat_signature())
+    return items
+
+
+def bench(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, len(result)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ENTRY_COUNT
+    root = tempfile.mkdtemp(prefix="bench_scanner_")
+    try:
+        populate(root, count)
+        rules = {name: [] for name in CATEGORIES}
+        # 与 Organizer 相同的排除列表规模：程序文件 + 分类文件夹（位于源目录与归档文件夹下）
+        exclude_paths = [os.path.join(root, n) for n in ("main.py", "config.ini", "rules.json", "system.log", "history.db")]
+        exclude_paths += [os.path.join(root, c) for c in CATEGORIES]
+        exclude_paths += [os.path.join(root, "归档文件夹", c) for c in CATEGORIES]
+
+        # 预热目录缓存，避免第一次扫描吃亏
+        legacy_scan(root, exclude_paths, rules)
+
+        legacy_time, legacy_count = bench(legacy_scan, root, exclude_paths, rules)
+        scandir_time, scandir_count = bench(scandir_scan, root, exclude_paths, rules)
+        print(f"条目数: {count}")
+        print(f"{'实现':<16} {'耗时(s)':>10} {'条目':>8} {'us/条目':>10}")
+        print(f"{'listdir+stat':<16} {legacy_time:>10.3f} {legacy_count:>8} {legacy_time / count * 1e6:>10.2f}")
+        print(f"{'scandir':<16} {scandir_time:>10.3f} {scandir_count:>8} {scandir_time / count * 1e6:>10.2f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+CLI 启动耗时基准测试
+
+通过 `python -X importtime main.py --help` 统计 CLI 路径的模块导入耗时，
+并检查 CLI 路径没有导入 GUI 与 AI SDK 相关模块。超出预算或导入了禁止的模块时以非零状态退出，
+可在打包前运行以防启动变慢。
+
+用法: python benchmarks/bench_startup.py [--budget-ms 150]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# CLI 路径不应加载的模块
+FORBIDDEN_MODULES = ("tkinter", "openai", "httpx", "ui.components", "ui.main_window")
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 [(模块名, 自身耗时us, 累计耗时us, 缩进层级), ...]"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI 启动耗时基准测试")
+    parser.add_argument("--budget-ms", type=float, default=150, help="导入耗时预算（毫秒）")
+    args = parser.parse_args()
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(ROOT_DIR, "main.py"), "--help"],
+        cwd=ROOT_DIR, capture_output=True, text=True, encoding="utf-8", errors="replace"
+    )
+    records = parse_importtime(proc.stderr)
+    top_level = [r for r in records if r[3] == 0]
+    total_ms = sum(r[2] for r in top_level) / 1000
+
+    print("耗时最多的顶层导入:")
+    for name, _, cumulative_us, _ in sorted(top_level, key=lambda r: r[2], reverse=True)[:10]:
+        print(f"  {cumulative_us / 1000:8.2f} ms  {name}")
+    print(f"导入总耗时: {total_ms:.2f} ms（预算 {args.budget_ms:.0f} ms）")
+
+    imported = {r[0] for r in records}
+    forbidden = sorted(m for m in imported if m.split(".")[0] in FORBIDDEN_MODULES or m in FORBIDDEN_MODULES)
+    failed = False
+    if forbidden:
+        print(f"CLI 路径导入了不应加载的模块: {', '.join(forbidden)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("导入耗时超出预算")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+AICache - AI 分类结果持久化缓存
+以 SQLite 存储在 history.db 旁边，键为 (规范化文件名, 是否文件夹, 模型, 分类集合哈希)
+"""
+import sqlite3
+import threading
+import logging
+import hashlib
+import time
+import unicodedata
+from typing import Iterable, List, Optional, Tuple
+
+
+class AICache:
+    """
+    AI 分类结果缓存
+
+    - 成功结果按 ttl 过期，失败/无效结果（负缓存）按较短的 negative_ttl 过期
+    - 条目数超过 max_entries 时按最近访问时间淘汰（LRU）
+    - 分类集合或模型变化后旧缓存自然失效（键中包含两者）
+    """
+
+    # 命中后最近访问时间的批量写回阈值
+    TOUCH_FLUSH_SIZE = 500
+
+    def __init__(self, db_file: str, model: str, rules_keys: Iterable[str],
+                 ttl: float = 30 * 86400, negative_ttl: float = 3600, max_entries: int = 100000):
+        """
+        Args:
+            db_file: 缓存数据库文件路径
+            model: 模型名称
+            rules_keys: 当前分类名称集合
+            ttl: 成功结果有效期（秒）
+            negative_ttl: 失败结果有效期（秒）
+            max_entries: 最大缓存条目数
+        """
+        self.model = model
+        self.categories_hash = hashlib.sha1("\n".join(sorted(rules_keys)).encode("utf-8")).hexdigest()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._touched = []
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.init_table()
+
+    def init_table(self):
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ai_cache (
+                filename TEXT,
+                is_dir INTEGER,
+                model TEXT,
+                categories_hash TEXT,
+                category TEXT,
+                created_at REAL,
+                last_access REAL,
+                PRIMARY KEY (filename, is_dir, model, categories_hash)
+            )
+        ''')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_ai_cache_last_access ON ai_cache (last_access)')
+        self.conn.commit()
+
+    @staticmethod
+    def normalize(filename: str) -> str:
+        """规范化文件名：Unicode NFKC + 忽略大小写 + 去除首尾空白"""
+        return unicodedata.normalize("NFKC", filename).strip().casefold()
+
+    def _key(self, filename: str, is_dir: bool) -> Tuple[str, int, str, str]:
+        return (self.normalize(filename), int(bool(is_dir)), self.model, self.categories_hash)
+
+    def get(self, filename: str, is_dir: bool = False) -> Tuple[bool, Optional[str]]:
+        """
+        查询缓存
+
+        Returns:
+            (是否命中, 分类)；命中负缓存时返回 (True, None)
+        """
+        return self.get_many([(filename, is_dir)])[0]
+
+    def get_many(self, items: List[Tuple[str, bool]]) -> List[Tuple[bool, Optional[str]]]:
+        """
+        批量查询缓存
+
+        Args:
+            items: [(文件名, 是否为文件夹), ...]
+
+        Returns:
+            与 items 一一对应的 (是否命中, 分类) 列表
+        """
+        now = time.time()
+        results = []
+        with self.lock:
+            try:
+                for filename, is_dir in items:
+                    key = self._key(filename, is_dir)
+                    self.cursor.execute('''
+                        SELECT category, created_at FROM ai_cache
+                        WHERE filename = ? AND is_dir = ? AND model = ? AND categories_hash = ?
+                    ''', key)
+                    row = self.cursor.fetchone()
+                    if row and now - row[1] < (self.ttl if row[0] else self.negative_ttl):
+                        if row[0]:
+                            self.hits += 1
+                        else:
+                            self.negative_hits += 1
+                        self._touched.append((now,) + key)
+                        results.append((True, row[0]))
+                    else:
+                        self.misses += 1
+                        results.append((False, None))
+                if len(self._touched) >= self.TOUCH_FLUSH_SIZE:
+                    self._flush_touched()
+            except Exception as e:
+                logging.error(f"读取 AI 缓存失败: {e}")
+                results.extend((False, None) for _ in range(len(items) - len(results)))
+        return results
+
+    def put(self, filename: str, is_dir: bool, category: Optional[str]):
+        """写入缓存，category 为 None 表示负缓存"""
+        self.put_many([(filename, is_dir, category)])
+
+    def put_many(self, entries: List[Tuple[str, bool, Optional[str]]]):
+        """
+        批量写入缓存
+
+        Args:
+            entries: [(文件名, 是否为文件夹, 分类或 None), ...]
+        """
+        if not entries:
+            return
+        now = time.time()
+        rows = [self._key(filename, is_dir) + (category, now, now) for filename, is_dir, category in entries]
+        with self.lock:
+            try:
+                self.cursor.executemany('''
+                    INSERT OR REPLACE INTO ai_cache
+                    (filename, is_dir, model, categories_hash, category, created_at, last_access)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                self.conn.commit()
+            except Exception as e:
+                logging.error(f"写入 AI 缓存失败: {e}")
+
+    def _flush_touched(self):
+        """写回命中条目的最近访问时间（调用方需持有锁）"""
+        if not self._touched:
+            return
+        self.cursor.executemany('''
+            UPDATE ai_cache SET last_access = ?
+            WHERE filename = ? AND is_dir = ? AND model = ? AND categories_hash = ?
+        ''', self._touched)
+        self.conn.commit()
+        self._touched = []
+
+    def evict(self):
+        """删除过期条目，并按最近访问时间淘汰超出 max_entries 的部分"""
+        now = time.time()
+        with self.lock:
+            try:
+                self._flush_touched()
+                self.cursor.execute('''
+                    DELETE FROM ai_cache
+                    WHERE (category IS NOT NULL AND created_at < ?)
+                       OR (category IS NULL AND created_at < ?)
+                ''', (now - self.ttl, now - self.negative_ttl))
+                self.cursor.execute('SELECT COUNT(*) FROM ai_cache')
+                overflow = self.cursor.fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    self.cursor.execute('''
+                        DELETE FROM ai_cache WHERE rowid IN (
+                            SELECT rowid FROM ai_cache ORDER BY last_access LIMIT ?
+                        )
+                    ''', (overflow,))
+                self.conn.commit()
+            except Exception as e:
+                logging.error(f"清理 AI 缓存失败: {e}")
+
+    def stats_message(self) -> str:
+        """返回本次运行的命中统计"""
+        return (f"AI 缓存: 命中 {self.hits + self.negative_hits} 次"
+                f"（其中失败结果 {self.negative_hits} 次），未命中 {self.misses} 次")
+
+    def close(self):
+        self.evict()
+        self.conn.close()
@@ -1,26 +1,277 @@
-from openai import OpenAI
+import json
 import logging
+import random
+import threading
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """令牌桶限流器：限制每分钟请求数，并支持在收到限流响应后整体暂停"""
+
+    def __init__(self, requests_per_minute, burst=1):
+        """
+        Args:
+            requests_per_minute: 每分钟允许的请求数，<= 0 表示不限流
+            burst: 令牌桶容量（允许的瞬时突发请求数）
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """阻塞直到获得一个令牌"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.rate <= 0:
+                    return
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """在 seconds 秒内暂停发放令牌（所有并发请求共享）"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被直接跳过"""
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败达到阈值后打开，冷却期内直接拒绝请求；
+    冷却结束后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, cooldown=60):
+        """
+        Args:
+            failure_threshold: 打开熔断器所需的连续失败次数，<= 0 表示禁用熔断
+            cooldown: 打开后到允许探测请求的冷却时间（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trip_count = 0
+        self.skipped_calls = 0
+        self.time_saved = 0.0
+        self._probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self, expected_wait=0.0):
+        """
+        是否允许发起请求；被拒绝时累计跳过次数与节省的等待时间
+
+        Args:
+            expected_wait: 若请求失败预计需要等待的时间（秒），用于估算节省时间
+        """
+        if self.failure_threshold <= 0:
+            return True
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.skipped_calls += 1
+            self.time_saved += expected_wait
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """
+        记录一次失败
+
+        Returns:
+            本次失败是否使熔断器打开
+        """
+        if self.failure_threshold <= 0:
+            return False
+        with self.lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.trip_count += 1
+                return True
+            return False
+
+    def stats(self):
+        with self.lock:
+            return {
+                'state': self.state,
+                'trip_count': self.trip_count,
+                'skipped_calls': self.skipped_calls,
+                'time_saved': round(self.time_saved, 1)
+            }
+
+
+class LatencyTracker:
+    """记录最近若干次成功请求的耗时，用于计算 p95 延迟"""
+
+    def __init__(self, window=50, min_samples=5):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def p95(self):
+        """样本不足时返回 None"""
+        with self.lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
 
 class AIClient:
-    def __init__(self, api_key, base_url, model, log_callback=None):
+    # 单文件请求超时上限（秒）；批量请求在此基础上按条目数追加
+    TIMEOUT = 10
+    BATCH_TIMEOUT_PER_ITEM = 1
+    # 自适应超时：p95 延迟的倍数，以及不低于的下限（秒）
+    TIMEOUT_P95_MULTIPLIER = 3
+    MIN_TIMEOUT = 3
+    # 限流/服务端错误重试的退避参数（秒）
+    BACKOFF_BASE = 1.0
+    BACKOFF_MAX = 60.0
+
+    def __init__(self, api_key, base_url, model, log_callback=None,
+                 requests_per_minute=0, concurrency=1, max_retries=3,
+                 circuit_threshold=5, circuit_cooldown=60):
         self.api_key = api_key
         self.base_url = base_url
         self.model = model
         self.log_callback = log_callback
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(requests_per_minute, burst=concurrency)
+        self.breaker = CircuitBreaker(circuit_threshold, circuit_cooldown)
+        # 单文件请求记录每次耗时；批量请求记录每个条目的平均耗时，不同大小的批次可共用
+        self.latency = {"single": LatencyTracker(), "batch": LatencyTracker()}
+        self._local = threading.local()
         self.client = None
-        self.init_client()
+        self.enabled = bool(self.api_key and self.api_key != "在此处填入你的 API_KEY")
+        self._client_lock = threading.Lock()
+        self._warm_up_thread = None
 
     def init_client(self):
-        if self.api_key and self.api_key != "在此处填入你的 API_KEY":
+        """
+        获取 OpenAI 客户端，首次调用时才导入 openai SDK 并创建客户端，
+        使没有 API Key 或所有文件都命中规则的运行无需加载 SDK
+
+        Returns:
+            OpenAI 客户端，未配置或初始化失败时返回 None
+        """
+        if self.client is not None or not self.enabled:
+            return self.client
+        with self._client_lock:
+            if self.client is None and self.enabled:
+                try:
+                    from openai import OpenAI
+                    # 重试由 _create_completion 统一处理，以便遵循 Retry-After 并与限流器配合
+                    self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+                    if self.log_callback:
+                        self.log_callback("AI 客户端初始化成功")
+                except Exception as e:
+                    self.enabled = False
+                    logging.error(f"AI 客户端初始化失败: {e}")
+        return self.client
+
+    def set_rate_limit(self, requests_per_minute, concurrency=1):
+        """更新限流参数（不重建 HTTP 客户端）"""
+        limiter = self.rate_limiter
+        if limiter.rate != requests_per_minute / 60.0 or limiter.capacity != max(1, concurrency):
+            self.rate_limiter = RateLimiter(requests_per_minute, burst=concurrency)
+
+    def set_circuit_breaker(self, failure_threshold, cooldown):
+        """更新熔断参数（保留当前状态与统计）"""
+        self.breaker.failure_threshold = failure_threshold
+        self.breaker.cooldown = cooldown
+
+    def circuit_stats(self):
+        """返回熔断器状态与累计统计：state、trip_count、skipped_calls、time_saved（秒）"""
+        return self.breaker.stats()
+
+    def consume_skipped(self):
+        """返回当前线程上一次请求后是否有请求因熔断被跳过，并清除该标记"""
+        skipped = getattr(self._local, "skipped", False)
+        self._local.skipped = False
+        return skipped
+
+    def current_timeout(self, batch_items=0):
+        """
+        根据最近的 p95 延迟计算自适应超时，上限为固定超时；
+        批量请求按每条目的 p95 耗时乘以本批条目数估算，小批次的样本不会让大批次超时
+
+        Args:
+            batch_items: 批量请求的条目数，0 表示单文件请求
+        """
+        ceiling = self.TIMEOUT + self.BATCH_TIMEOUT_PER_ITEM * batch_items
+        p95 = self.latency["batch" if batch_items else "single"].p95()
+        if p95 is None:
+            return ceiling
+        expected = p95 * batch_items if batch_items else p95
+        return min(ceiling, max(self.MIN_TIMEOUT, expected * self.TIMEOUT_P95_MULTIPLIER))
+
+    def warm_up(self):
+        """
+        在后台线程中预先建立到 API 的连接（DNS 解析、TLS 握手），
+        使第一次真正的分类请求直接复用连接池中的长连接。预热进行中时不会重复发起，失败时静默忽略
+        """
+        if not self.enabled or (self._warm_up_thread is not None and self._warm_up_thread.is_alive()):
+            return
+
+        def task():
             try:
-                self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
-                if self.log_callback:
-                    self.log_callback("AI 客户端初始化成功")
+                client = self.init_client()
+                if client:
+                    client.models.list(timeout=self.TIMEOUT)
             except Exception as e:
-                logging.error(f"AI 客户端初始化失败: {e}")
+                logging.debug(f"AI 连接预热失败: {e}")
+
+        self._warm_up_thread = threading.Thread(target=task, daemon=True)
+        self._warm_up_thread.start()
+
+    def close(self):
+        """关闭底层 HTTP 连接池"""
+        if self.client:
+            try:
+                self.client.close()
+            except Exception as e:
+                logging.debug(f"关闭 AI 客户端失败: {e}")
+            self.client = None
 
     def ask_ai(self, filename, rules_keys, is_dir=False):
-        if not self.client:
+        if not self.init_client():
             return None
             
         type_str = "文件夹" if is_dir else "文件"
@@ -31,17 +282,182 @@ class AIClient:
         prompt = f"请将{type_str} '{filename}' 归类到以下类别之一：[{categories}]。只返回类别名称。"
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                timeout=10
+            response = self._create_completion(
+                messages=[{"role": "user", "content": prompt}]
             )
             result = response.choices[0].message.content.strip()
             for cat in rules_keys:
                 if cat in result:
                     return cat
+        except CircuitOpenError:
+            pass
         except Exception as e:
             logging.error(f"AI 调用失败: {e}")
             if self.log_callback:
                 self.log_callback(f"AI 调用失败: {e}")
         return None
+
+    def ask_ai_batch(self, items, rules_keys, max_retries=1):
+        """
+        一次请求识别多个文件/文件夹
+
+        Args:
+            items: [(文件名, 是否为文件夹), ...]
+            rules_keys: 可选分类名称
+            max_retries: 对缺失或无效的条目重新询问的轮数
+
+        Returns:
+            与 items 一一对应的分类列表，无法识别的位置为 None
+        """
+        results = [None] * len(items)
+        if not items or not self.init_client():
+            return results
+
+        rules_keys = list(rules_keys)
+        pending = list(range(len(items)))
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            if self.log_callback:
+                action = "正在请求 AI 批量识别" if attempt == 0 else "正在重新询问 AI"
+                self.log_callback(f"{action}: {len(pending)} 个项目 ...")
+            try:
+                answers = self._request_batch([items[i] for i in pending], rules_keys)
+            except CircuitOpenError:
+                break
+            still_pending = []
+            for pos, idx in enumerate(pending):
+                cat = self._match_category(answers.get(str(pos + 1)), rules_keys)
+                if cat:
+                    results[idx] = cat
+                else:
+                    still_pending.append(idx)
+            pending = still_pending
+        return results
+
+    def _request_batch(self, items, rules_keys):
+        """发送一次批量请求，返回 {编号: 回答} 字典，失败返回空字典"""
+        categories = ", ".join(rules_keys)
+        lines = "\n".join(
+            f"{i}. [{'文件夹' if is_dir else '文件'}] {name}"
+            for i, (name, is_dir) in enumerate(items, 1)
+        )
+        prompt = (
+            f"请将以下每个条目归类到这些类别之一：[{categories}]。\n"
+            f"{lines}\n"
+            f"以 JSON 对象返回结果，键为条目编号（字符串），值为类别名称，例如 {{\"1\": \"类别\"}}。只返回 JSON。"
+        )
+        try:
+            response = self._create_completion(
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"},
+                batch_items=len(items)
+            )
+            return self._parse_json_object(response.choices[0].message.content)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logging.error(f"AI 批量调用失败: {e}")
+            if self.log_callback:
+                self.log_callback(f"AI 批量调用失败: {e}")
+        return {}
+
+    def _create_completion(self, batch_items=0, **kwargs):
+        """
+        发送一次 chat completion 请求：先经过熔断器与限流器，超时按近期 p95 延迟自适应；
+        遇到限流 (429)、服务端错误或连接错误时按指数退避加抖动重试，并优先遵循 Retry-After。
+        每次失败的尝试都计入熔断器，熔断打开时抛出 CircuitOpenError
+
+        Args:
+            batch_items: 批量请求的条目数，0 表示单文件请求
+        """
+        attempt = 0
+        while True:
+            timeout = self.current_timeout(batch_items)
+            if not self.breaker.allow(expected_wait=timeout):
+                self._local.skipped = True
+                raise CircuitOpenError("AI 服务熔断中，跳过请求")
+            self.rate_limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = self.client.chat.completions.create(model=self.model, timeout=timeout, **kwargs)
+            except Exception as e:
+                if self.breaker.record_failure():
+                    message = (f"AI 服务连续失败 {self.breaker.failures} 次，熔断 {self.breaker.cooldown:g} 秒，"
+                               f"期间未识别的项目将直接使用默认分类或推迟处理")
+                    logging.warning(message)
+                    if self.log_callback:
+                        self.log_callback(message)
+                status = getattr(e, "status_code", None)
+                retryable = status == 429 or (status is not None and status >= 500) or \
+                    (status is None and type(e).__name__ in ("APIConnectionError", "APITimeoutError"))
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                retry_after = self._retry_after_seconds(e)
+                if retry_after is not None:
+                    delay = max(delay, min(retry_after, self.BACKOFF_MAX))
+                if status == 429:
+                    self.rate_limiter.pause(delay)
+                attempt += 1
+                logging.warning(f"AI 请求失败 ({status or type(e).__name__})，{delay:.1f} 秒后第 {attempt} 次重试")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            elapsed = time.monotonic() - started
+            if batch_items:
+                self.latency["batch"].record(elapsed / batch_items)
+            else:
+                self.latency["single"].record(elapsed)
+            return response
+
+    @staticmethod
+    def _retry_after_seconds(error):
+        """从错误响应头中解析 Retry-After（支持秒数、HTTP 日期和 retry-after-ms）"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        try:
+            retry_ms = headers.get("retry-after-ms")
+            if retry_ms:
+                return float(retry_ms) / 1000
+            retry_after = headers.get("retry-after")
+            if not retry_after:
+                return None
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                from email.utils import parsedate_to_datetime
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except Exception:
+            return None
+
+    @staticmethod
+    def _parse_json_object(content):
+        """从模型回复中解析 JSON 对象（兼容 ```json 代码块包裹）"""
+        if not content:
+            return {}
+        start, end = content.find("{"), content.rfind("}")
+        if start < 0 or end <= start:
+            return {}
+        try:
+            data = json.loads(content[start:end + 1])
+        except ValueError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {str(k).strip(): v for k, v in data.items()}
+
+    @staticmethod
+    def _match_category(answer, rules_keys):
+        """校验模型给出的类别，必须属于 rules_keys"""
+        if not isinstance(answer, str):
+            return None
+        answer = answer.strip()
+        if answer in rules_keys:
+            return answer
+        for cat in rules_keys:
+            if cat in answer:
+                return cat
+        return None
@@ -3,12 +3,14 @@ AIOrganizerAssistant - 核心业务逻辑封装
 将配置管理、数据库操作、整理与还原逻辑封装在一起，便于 CLI 和 GUI 共享
 """
 import logging
-from typing import Callable, Optional, Dict, Any
+from contextlib import contextmanager
+from typing import Callable, Optional, Dict, Any, Iterator
 from datetime import datetime
 
 from .config_manager import ConfigManager, get_paths, migrate_old_data
-from .db_manager import DBManager
+from .db_manager import DBManager, HistoryFilter, HistoryRow, parse_time
 from .organizer import Organizer
+from .ai_client import AIClient
 from .restorer import Restorer
 
 
@@ -48,7 +50,14 @@ class AppCore:
     def _setup_managers(self):
         """初始化各类管理器"""
         self.cm = ConfigManager(self.paths)
-        self.db = DBManager(self.paths["DB_FILE"], self.paths["EXE_DIR"])
+        self.db = DBManager(
+            self.paths["DB_FILE"], self.paths["EXE_DIR"],
+            batch_size=self.cm.config.getint('SETTINGS', 'DB_BATCH_SIZE', fallback=500),
+            flush_interval_ms=self.cm.config.getint('SETTINGS', 'DB_FLUSH_MS', fallback=200)
+        )
+        # 长期复用的 AI 客户端（保持连接池），仅在 API_KEY/BASE_URL/MODEL 变化时重建
+        self._ai_client: Optional[AIClient] = None
+        self._ai_client_key = None
         
     def reload_config(self):
         """重新加载配置和规则"""
@@ -59,7 +68,8 @@ class AppCore:
     def run_organize(self, 
                      api_key: Optional[str] = None, 
                      dry_run: bool = False,
-                     source_dir: Optional[str] = None) -> Dict[str, Any]:
+                     source_dir: Optional[str] = None,
+                     **scan_options) -> Dict[str, Any]:
         """
         执行整理任务
         
@@ -67,6 +77,7 @@ class AppCore:
             api_key: API 密钥，如不提供则使用配置文件中的值
             dry_run: 预演模式
             source_dir: 源目录，如不提供则使用 EXE_DIR
+            scan_options: 扫描范围（recursive、max_depth、include、exclude），未提供的使用配置文件中的值
             
         Returns:
             执行结果字典，包含状态和统计信息
@@ -81,19 +92,8 @@ class AppCore:
             # 确保使用最新的规则
             self.reload_config()
             
-            # 获取 API Key
-            api_key = api_key if api_key else self.cm.config.get('SETTINGS', 'API_KEY', fallback='').strip()
-            
             # 创建 Organizer 实例
-            organizer = Organizer(
-                paths=self.paths,
-                config=self.cm.config,
-                rules=self.cm.rules,
-                db=self.db,
-                log_callback=self.log_callback,
-                api_key=api_key,
-                dry_run=dry_run
-            )
+            organizer = self._create_organizer(api_key, dry_run, **scan_options)
             
             # 如果指定了源目录，覆盖默认值
             if source_dir:
@@ -107,7 +107,11 @@ class AppCore:
             if dry_run:
                 self._log("--- 预演模式 ---")
             
-            organizer.run()
+            circuit_before = organizer.ai_client.circuit_stats()
+            with self._track_run("整理", dry_run) as run_id:
+                result['run_id'] = run_id
+                result['items_processed'] = organizer.run()
+            result['ai_circuit'] = self._circuit_delta(circuit_before, organizer.ai_client.circuit_stats())
             
             # 恢复原始路径
             if source_dir:
@@ -124,12 +128,214 @@ class AppCore:
             
         return result
         
-    def run_restore(self, source_dir: Optional[str] = None) -> Dict[str, Any]:
+    def get_ai_client(self, api_key: Optional[str] = None) -> AIClient:
+        """
+        获取共享的 AI 客户端
+        
+        客户端在多次整理之间复用 HTTP 连接池（DNS、TLS 与长连接），
+        仅当 API_KEY、BASE_URL 或 MODEL 变化时才重建；限流与熔断参数变化时原地更新
+        
+        Args:
+            api_key: API 密钥，如不提供则使用配置文件中的值
+            
+        Returns:
+            AI 客户端实例
+        """
+        config = self.cm.config
+        api_key = api_key if api_key else config.get('SETTINGS', 'API_KEY', fallback='').strip()
+        base_url = config.get('SETTINGS', 'BASE_URL', fallback='https://api.deepseek.com').strip()
+        model = config.get('SETTINGS', 'MODEL', fallback='deepseek-chat').strip()
+        rpm = config.getint('SETTINGS', 'AI_RPM', fallback=60)
+        concurrency = config.getint('SETTINGS', 'AI_CONCURRENCY', fallback=4)
+        circuit_threshold = config.getint('SETTINGS', 'AI_CIRCUIT_THRESHOLD', fallback=5)
+        circuit_cooldown = config.getfloat('SETTINGS', 'AI_CIRCUIT_COOLDOWN', fallback=60)
+        
+        key = (api_key, base_url, model)
+        if self._ai_client is None or self._ai_client_key != key:
+            if self._ai_client is not None:
+                self._ai_client.close()
+            self._ai_client = AIClient(
+                api_key, base_url, model, self.log_callback,
+                requests_per_minute=rpm,
+                concurrency=concurrency,
+                circuit_threshold=circuit_threshold,
+                circuit_cooldown=circuit_cooldown
+            )
+            self._ai_client_key = key
+        else:
+            self._ai_client.set_rate_limit(rpm, concurrency)
+            self._ai_client.set_circuit_breaker(circuit_threshold, circuit_cooldown)
+        return self._ai_client
+        
+    @staticmethod
+    def _circuit_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+        """计算单次运行期间的熔断统计（共享客户端的计数是累计值）"""
+        return {
+            'state': after['state'],
+            'trip_count': after['trip_count'] - before['trip_count'],
+            'skipped_calls': after['skipped_calls'] - before['skipped_calls'],
+            'time_saved': round(after['time_saved'] - before['time_saved'], 1)
+        }
+        
+    @contextmanager
+    def _track_run(self, action: str, dry_run: bool = False):
+        """在 runs 表中记录一次运行，期间写入的历史记录都关联到该运行编号"""
+        run_id = self.db.start_run(action, self.paths["EXE_DIR"], dry_run)
+        if run_id is not None:
+            self._log(f"运行编号: {run_id}")
+        try:
+            yield run_id
+        finally:
+            self.db.finish_run(run_id)
+        
+    def _create_organizer(self, api_key: Optional[str] = None, dry_run: bool = False, **scan_options) -> Organizer:
+        """按当前配置创建 Organizer（复用共享的 AI 客户端）"""
+        return Organizer(
+            paths=self.paths,
+            config=self.cm.config,
+            rules=self.cm.rules,
+            db=self.db,
+            log_callback=self.log_callback,
+            dry_run=dry_run,
+            ai_client=self.get_ai_client(api_key),
+            **scan_options
+        )
+        
+    def run_plan(self,
+                 out_path: str,
+                 api_key: Optional[str] = None,
+                 source_dir: Optional[str] = None,
+                 **scan_options) -> Dict[str, Any]:
+        """
+        生成整理计划（只分类不移动）
+        
+        Args:
+            out_path: 计划文件输出路径（JSONL）
+            api_key: API 密钥，如不提供则使用配置文件中的值
+            source_dir: 源目录，如不提供则使用 EXE_DIR
+            scan_options: 扫描范围（recursive、max_depth、include、exclude），未提供的使用配置文件中的值
+            
+        Returns:
+            执行结果字典，包含状态和计划条目数
+        """
+        result = {
+            'success': False,
+            'message': '',
+            'items_planned': 0
+        }
+        
+        original_exe_dir = self.paths["EXE_DIR"]
+        try:
+            self.reload_config()
+            if source_dir:
+                self.paths["EXE_DIR"] = source_dir
+            organizer = self._create_organizer(api_key, **scan_options)
+            circuit_before = organizer.ai_client.circuit_stats()
+            result['items_planned'] = organizer.write_plan(out_path)
+            result['ai_circuit'] = self._circuit_delta(circuit_before, organizer.ai_client.circuit_stats())
+            result['success'] = True
+            result['message'] = f'计划已生成: {out_path}'
+        except Exception as e:
+            error_msg = f"生成计划失败: {e}"
+            self._log(error_msg)
+            result['message'] = error_msg
+            logging.error(error_msg, exc_info=True)
+        finally:
+            self.paths["EXE_DIR"] = original_exe_dir
+            
+        return result
+        
+    def run_watch(self,
+                  api_key: Optional[str] = None,
+                  dry_run: bool = False,
+                  source_dir: Optional[str] = None,
+                  stop_event=None,
+                  **scan_options) -> Dict[str, Any]:
+        """
+        监视源目录并整理新出现的文件，直到按下 Ctrl+C 或 stop_event 被设置
+        
+        Args:
+            api_key: API 密钥，如不提供则使用配置文件中的值
+            dry_run: 预演模式
+            source_dir: 源目录，如不提供则使用 EXE_DIR
+            stop_event: threading.Event，设置后停止监视（GUI 等非命令行调用方使用）
+            scan_options: 过滤条件（include、exclude），未提供的使用配置文件中的值
+            
+        Returns:
+            执行结果字典，包含状态信息
+        """
+        result = {
+            'success': False,
+            'message': ''
+        }
+        
+        original_exe_dir = self.paths["EXE_DIR"]
+        try:
+            self.reload_config()
+            if source_dir:
+                self.paths["EXE_DIR"] = source_dir
+            organizer = self._create_organizer(api_key, dry_run, **scan_options)
+            with self._track_run("监视", dry_run) as run_id:
+                result['run_id'] = run_id
+                organizer.watch(stop_event)
+            result['success'] = True
+            result['message'] = '监视已停止'
+        except Exception as e:
+            error_msg = f"监视任务失败: {e}"
+            self._log(error_msg)
+            result['message'] = error_msg
+            logging.error(error_msg, exc_info=True)
+        finally:
+            self.paths["EXE_DIR"] = original_exe_dir
+            
+        return result
+        
+    def run_apply(self, plan_path: str, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        按计划文件执行整理，不重新分类、不调用 AI
+        
+        Args:
+            plan_path: 计划文件路径
+            dry_run: 预演模式
+            
+        Returns:
+            执行结果字典，包含状态和统计信息
+        """
+        result = {
+            'success': False,
+            'message': '',
+            'items_processed': 0
+        }
+        
+        try:
+            self.reload_config()
+            # 计划中已包含分类与目标目录，apply_plan 不会重新分类
+            organizer = self._create_organizer(dry_run=dry_run)
+            with self._track_run("整理", dry_run) as run_id:
+                result['run_id'] = run_id
+                result['items_processed'] = organizer.apply_plan(plan_path)
+            result['success'] = True
+            result['message'] = '计划执行完成'
+        except Exception as e:
+            error_msg = f"执行计划失败: {e}"
+            self._log(error_msg)
+            result['message'] = error_msg
+            logging.error(error_msg, exc_info=True)
+            
+        return result
+        
+    def run_restore(self, source_dir: Optional[str] = None, since: Optional[str] = None,
+                    until: Optional[str] = None, run_id: Optional[int] = None) -> Dict[str, Any]:
         """
         执行还原任务
         
+        指定 run_id 或 since/until 时按历史记录只还原对应的移动，否则把所有分类文件夹中的项目移回源目录
+        
         Args:
             source_dir: 源目录，如不提供则使用 EXE_DIR
+            run_id: 要撤销的运行编号
+            since: 起始时间 "YYYY-MM-DD [HH:MM[:SS]]"（含）
+            until: 结束时间（含），只给出日期时包含当天
             
         Returns:
             执行结果字典，包含状态和统计信息
@@ -156,8 +362,13 @@ class AppCore:
             )
             
             # 执行还原
-            self._log("=== 开始还原 ===")
-            restorer.run()
+            with self._track_run("还原") as current_run:
+                result['run_id'] = current_run
+                if run_id is not None or since or until:
+                    result['items_restored'] = restorer.run_journal(run_id=run_id, since=since, until=until)
+                else:
+                    self._log("=== 开始还原 ===")
+                    result['items_restored'] = restorer.run()
             
             # 恢复原始路径
             if source_dir:
@@ -183,6 +394,82 @@ class AppCore:
         """
         return self.db.export_csv()
         
+    def query_history(self,
+                      filters: Optional[Dict[str, Any]] = None,
+                      after_id: int = 0,
+                      limit: int = 100,
+                      descending: bool = False) -> Iterator[HistoryRow]:
+        """
+        分页查询历史记录，供界面浏览使用（不导出文件）
+        
+        Args:
+            filters: 筛选条件，键同 HistoryFilter（run_id、since、until、status、action、item_type、dest_path、filename），
+                     since/until 为 "YYYY-MM-DD [HH:MM[:SS]]"
+            after_id: 上一页最后一条记录的 id，0 表示第一页
+            limit: 每页行数
+            descending: 是否从最新的记录开始
+            
+        Returns:
+            HistoryRow 迭代器
+        """
+        filters = dict(filters or {})
+        filters['since'] = parse_time(filters.get('since'))
+        filters['until'] = parse_time(filters.get('until'), end=True)
+        return self.db.query_history(HistoryFilter(**filters), after_id, limit, descending)
+        
+    def run_export(self,
+                   out_path: Optional[str] = None,
+                   fmt: str = "csv",
+                   run_id: Optional[int] = None,
+                   since: Optional[str] = None,
+                   until: Optional[str] = None,
+                   status: Optional[str] = None,
+                   incremental: bool = False) -> Dict[str, Any]:
+        """
+        流式导出历史记录（包含已存档的旧记录）
+        
+        Args:
+            out_path: 输出文件路径，默认在源目录下按时间命名
+            fmt: 格式，csv、csv.gz、jsonl 或 jsonl.gz
+            run_id: 只导出该运行的记录
+            since: 起始时间 "YYYY-MM-DD [HH:MM[:SS]]"（含）
+            until: 结束时间（含），只给出日期时包含当天
+            status: 只导出该状态的记录（SUCCESS、FAIL、SKIP）
+            incremental: 只导出上次增量导出之后的新记录
+            
+        Returns:
+            执行结果字典，包含状态、导出文件路径和行数
+        """
+        result = {
+            'success': False,
+            'message': '',
+            'path': None,
+            'rows_exported': 0
+        }
+        
+        try:
+            path, rows = self.db.export_history(
+                path=out_path,
+                fmt=fmt,
+                run_id=run_id,
+                since=parse_time(since),
+                until=parse_time(until, end=True),
+                status=status,
+                incremental=incremental
+            )
+            if path is None:
+                result['message'] = '导出失败，详见日志'
+            else:
+                result.update(success=True, path=path, rows_exported=rows)
+                result['message'] = f'已导出 {rows} 条记录: {path}'
+        except Exception as e:
+            error_msg = f"导出失败: {e}"
+            self._log(error_msg)
+            result['message'] = error_msg
+            logging.error(error_msg, exc_info=True)
+            
+        return result
+        
     def save_config(self, settings_dict: Dict[str, Any]) -> bool:
         """
         保存配置
@@ -220,6 +507,9 @@ class AppCore:
             return False
             
     def close(self):
-        """关闭数据库连接"""
+        """关闭数据库连接和 AI 客户端"""
+        if self._ai_client is not None:
+            self._ai_client.close()
+            self._ai_client = None
         self.db.close()
         self._log("应用已关闭")
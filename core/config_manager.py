@@ -22,7 +22,9 @@ def get_paths(target_name_from_config=None):
         "CONFIG_FILE": os.path.join(app_data_dir, "config.ini"),
         "RULES_FILE": os.path.join(app_data_dir, "rules.json"),
         "LOG_FILE": os.path.join(app_data_dir, "system.log"),
-        "DB_FILE": os.path.join(app_data_dir, "history.db")
+        "DB_FILE": os.path.join(app_data_dir, "history.db"),
+        "AI_CACHE_FILE": os.path.join(app_data_dir, "ai_cache.db"),
+        "MODEL_FILE": os.path.join(app_data_dir, "classifier.json.gz")
     }
 
 class ConfigManager:
@@ -46,6 +48,35 @@ MODEL = deepseek-chat
 TARGET_NAME = 归档文件夹
 DRY_RUN = False
 LOG_RETENTION_COUNT = 100
+LOG_ARCHIVE = True
+AI_BATCH_SIZE = 50
+AI_CONCURRENCY = 4
+AI_RPM = 60
+AI_CIRCUIT_THRESHOLD = 5
+AI_CIRCUIT_COOLDOWN = 60
+AI_CIRCUIT_OPEN_ACTION = default
+AI_CLUSTER_THRESHOLD = 0.8
+AI_CACHE_TTL_DAYS = 30
+AI_CACHE_NEGATIVE_TTL_MINUTES = 60
+AI_CACHE_MAX_ENTRIES = 100000
+CONTENT_SNIFF = True
+ML_ENABLED = True
+ML_CONFIDENCE = 0.9
+ML_MIN_SAMPLES = 50
+RECURSIVE = False
+MAX_DEPTH = 0
+SCAN_CHUNK_SIZE = 1000
+MOVE_WORKERS = 4
+MOVE_LARGE_WORKERS = 1
+MOVE_LARGE_THRESHOLD_MB = 256
+WATCH_SETTLE_SECONDS = 5
+WATCH_POLL_INTERVAL = 2
+WATCH_MAINTENANCE_MINUTES = 30
+DEDUPE = False
+DEDUPE_ACTION = skip
+DEDUPE_CATEGORY = 22_重复文件
+DB_BATCH_SIZE = 500
+DB_FLUSH_MS = 200
 """
         with open(self.paths["CONFIG_FILE"], 'w', encoding='utf-8') as f:
             f.write(config_content)
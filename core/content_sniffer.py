@@ -0,0 +1,139 @@
+"""
+ContentSniffer - 文件头魔数识别
+只读取文件开头的固定字节数，与内置签名表比对，推断文件的真实类型（以扩展名表示）
+"""
+import os
+import stat
+from typing import Optional, Tuple
+
+# 单次读取的文件头大小（字节）
+HEADER_SIZE = 4096
+
+# ISO 9660 卷描述符标识位于 0x8001，超出文件头范围，仅在文件头无法识别时单独读取 5 字节
+ISO_MAGIC_OFFSET = 0x8001
+ISO_MAGIC = b"CD001"
+
+# (偏移, 魔数, 候选扩展名)：候选扩展名按顺序在规则中查找，第一个命中的决定分类
+SIGNATURES = [
+    (0, b"%PDF-", (".pdf",)),
+    (0, b"\x89PNG\r\n\x1a\n", (".png",)),
+    (0, b"\xff\xd8\xff", (".jpg", ".jpeg")),
+    (0, b"GIF87a", (".gif",)),
+    (0, b"GIF89a", (".gif",)),
+    (0, b"8BPS", (".psd",)),
+    (0, b"Rar!\x1a\x07", (".rar",)),
+    (0, b"7z\xbc\xaf\x27\x1c", (".7z",)),
+    (0, b"\xfd7zXZ\x00", (".xz",)),
+    (0, b"\x1f\x8b", (".gz",)),
+    (0, b"BZh", (".bz2",)),
+    (257, b"ustar", (".tar",)),
+    (0, b"!<arch>\ndebian", (".deb",)),
+    (0, b"\xed\xab\xee\xdb", (".rpm",)),
+    (0, b"\x7fELF", (".elf", ".so", ".exe")),
+    (0, b"MZ", (".exe",)),
+    (0, b"ID3", (".mp3",)),
+    (0, b"\xff\xfb", (".mp3",)),
+    (0, b"fLaC", (".flac",)),
+    (0, b"OggS", (".ogg",)),
+    (0, b"SQLite format 3\x00", (".sqlite", ".db")),
+    (0, b"wOFF", (".woff",)),
+    (0, b"wOF2", (".woff2",)),
+    (0, b"OTTO", (".otf",)),
+    (0, b"\x00\x01\x00\x00\x00", (".ttf",)),
+    (0, b"{\\rtf", (".rtf",)),
+]
+
+# ISO BMFF (MP4/MOV/HEIC) 的主品牌
+FTYP_BRANDS = {
+    b"qt  ": (".mov",),
+    b"M4A ": (".m4a",),
+    b"M4V ": (".m4v", ".mp4"),
+    b"heic": (".heic",),
+    b"heix": (".heic",),
+    b"mif1": (".heic",),
+    b"msf1": (".heic",),
+}
+
+RIFF_FORMATS = {
+    b"WEBP": (".webp",),
+    b"WAVE": (".wav",),
+    b"AVI ": (".avi",),
+}
+
+
+def _pread(fd: int, size: int, offset: int) -> bytes:
+    """从指定偏移读取至多 size 字节（POSIX 使用 os.pread，Windows 退化为 lseek + read）"""
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def _sniff_zip(header: bytes) -> Tuple[str, ...]:
+    """ZIP 容器：根据首个条目等特征区分 APK/EPUB/JAR/Office 文档"""
+    if header[30:58] == b"mimetypeapplication/epub+zip":
+        return (".epub",)
+    if b"AndroidManifest.xml" in header or b"classes.dex" in header:
+        return (".apk",)
+    if b"[Content_Types].xml" in header or b"_rels/.rels" in header:
+        if b"word/" in header:
+            return (".docx",)
+        if b"xl/" in header:
+            return (".xlsx",)
+        if b"ppt/" in header:
+            return (".pptx",)
+    if b"META-INF/" in header:
+        return (".jar", ".zip")
+    return (".zip",)
+
+
+def sniff_header(header: bytes) -> Optional[Tuple[str, ...]]:
+    """
+    根据文件头推断类型
+
+    Returns:
+        候选扩展名元组，无法识别返回 None
+    """
+    if header.startswith(b"PK\x03\x04"):
+        return _sniff_zip(header)
+    if header[4:8] == b"ftyp":
+        return FTYP_BRANDS.get(header[8:12], (".mp4",))
+    if header.startswith(b"RIFF"):
+        return RIFF_FORMATS.get(header[8:12])
+    if header.startswith(b"\x1a\x45\xdf\xa3"):
+        return (".webm",) if b"webm" in header[:64] else (".mkv",)
+    for offset, magic, exts in SIGNATURES:
+        if header[offset:offset + len(magic)] == magic:
+            return exts
+    text = header[:512].lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith(b"<!doctype html") or text.startswith(b"<html"):
+        return (".html", ".htm")
+    return None
+
+
+def sniff_file(path: str) -> Optional[Tuple[str, ...]]:
+    """
+    读取文件头并推断类型：无论文件多大，只做一次 HEADER_SIZE 字节的读取；
+    仅当文件头无法识别且文件足够大时，再读取 ISO 卷描述符处的 5 字节
+
+    Returns:
+        候选扩展名元组，无法识别或读取失败返回 None
+    """
+    try:
+        # O_NONBLOCK：即使传入的是 FIFO 等特殊文件，打开时也不会阻塞
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_NONBLOCK", 0))
+    except OSError:
+        return None
+    try:
+        if not stat.S_ISREG(os.fstat(fd).st_mode):
+            return None
+        header = _pread(fd, HEADER_SIZE, 0)
+        exts = sniff_header(header)
+        if exts is None and len(header) == HEADER_SIZE:
+            if _pread(fd, len(ISO_MAGIC), ISO_MAGIC_OFFSET) == ISO_MAGIC:
+                exts = (".iso",)
+        return exts
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
@@ -1,20 +1,233 @@
 import sqlite3
 import threading
 import logging
-import csv
+import queue
+import time
 import os
+import pathlib
+from dataclasses import dataclass, replace
 from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from .history_archive import HistoryArchive
+from .history_export import EXPORT_FORMATS, ExportWriter
+
+# 数据库结构版本（PRAGMA user_version），init_table 依次执行尚未执行的迁移
+SCHEMA_VERSION = 4
+# 迁移回填时每个事务处理的行数，升级大数据库时不会长时间锁住数据库
+MIGRATION_BATCH = 5000
+# 清理旧记录时每个事务删除的行数，以及每步增量回收的页数（每块之间释放锁，写入线程不会被长时间阻塞）
+PRUNE_CHUNK = 2000
+VACUUM_STEP_PAGES = 1000
+# 导出时每次从游标读取的行数
+EXPORT_CHUNK = 5000
+# 分页查询每页的最大行数
+QUERY_MAX_LIMIT = 10000
+# 旧版本 timestamp 列的文本格式
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 操作与项目类型以整数代码存储；不在表中的值仍写入原来的文本列
+ACTION_CODES = {"整理": 1, "还原": 2, "去重": 3, "监视": 4}
+ITEM_TYPE_CODES = {"文件": 1, "文件夹": 2}
+
+
+def _decode_sql(code_column, text_column, codes):
+    cases = " ".join(f"WHEN {code} THEN '{name}'" for name, code in codes.items())
+    return f"CASE {code_column} {cases} ELSE {text_column} END"
+
+
+def _time_conditions(since, until, legacy=False):
+    """
+    时间筛选条件
+
+    Args:
+        since: 起始时间（含，Unix 时间戳），None 表示不限
+        until: 结束时间（含，Unix 时间戳），None 表示不限
+        legacy: 旧记录尚未回填完成，同时按文本时间匹配 ts 为空的记录
+
+    Returns:
+        (条件列表, 参数列表)
+    """
+    conditions, params = [], []
+    for value, operator in ((since, ">="), (until, "<=")):
+        if value is None:
+            continue
+        if legacy:
+            conditions.append(f"(ts {operator} ? OR (ts IS NULL AND timestamp {operator} ?))")
+            params += [value, format_time(value)]
+        else:
+            conditions.append(f"ts {operator} ?")
+            params.append(value)
+    return conditions, params
+
+
+# 查询时把代码与整数时间戳还原为文本
+ACTION_SQL = _decode_sql("action_code", "action", ACTION_CODES)
+ITEM_TYPE_SQL = _decode_sql("type_code", "item_type", ITEM_TYPE_CODES)
+TIME_SQL = "COALESCE(strftime('%Y-%m-%d %H:%M:%S', ts, 'unixepoch', 'localtime'), timestamp)"
+
+def parse_time(value, end=False):
+    """
+    把命令行/界面输入的时间转换为历史记录使用的 Unix 时间戳
+
+    Args:
+        value: "YYYY-MM-DD"、"YYYY-MM-DD HH:MM" 或 "YYYY-MM-DD HH:MM:SS"
+        end: 只给出日期时是否取当天结束时刻（用于结束时间）
+
+    Returns:
+        Unix 时间戳（本地时间），value 为空时返回 None
+    """
+    if not value:
+        return None
+    value = value.strip().replace("T", " ")
+    for fmt in (TIMESTAMP_FORMAT, "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if fmt == "%Y-%m-%d" and end:
+            parsed = parsed.replace(hour=23, minute=59, second=59)
+        return int(parsed.timestamp())
+    raise ValueError(f"无法识别的时间: {value}（应为 YYYY-MM-DD [HH:MM[:SS]]）")
+
+
+def format_time(ts):
+    """Unix 时间戳转为历史记录的文本时间（本地时间），None 原样返回"""
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts).strftime(TIMESTAMP_FORMAT)
+
+
+@dataclass
+class HistoryRow:
+    """一条历史记录（操作与类型已还原为文本）"""
+
+    id: int
+    time: Optional[str]          # "YYYY-MM-DD HH:MM:SS"（本地时间）
+    action: Optional[str]        # 整理、还原、去重 ...
+    item_type: Optional[str]     # 文件 / 文件夹
+    filename: Optional[str]
+    source_path: Optional[str]
+    dest_path: Optional[str]
+    status: Optional[str]        # SUCCESS、FAIL: ...、SKIP: ...
+    run_id: Optional[int]
+
+
+@dataclass
+class HistoryFilter:
+    """历史记录的筛选条件，未设置的字段不参与筛选"""
+
+    run_id: Optional[int] = None
+    since: Optional[int] = None       # 起始时间（含，Unix 时间戳）
+    until: Optional[int] = None       # 结束时间（含，Unix 时间戳）
+    status: Optional[str] = None      # 状态前缀，如 SUCCESS、FAIL、SKIP
+    action: Optional[str] = None      # 整理、还原、去重 ...
+    item_type: Optional[str] = None   # 文件 / 文件夹
+    dest_path: Optional[str] = None   # 目标路径（精确匹配，走索引）
+    filename: Optional[str] = None    # 文件名包含的文字
+
+    def to_sql(self, legacy: bool = False) -> Tuple[List[str], list]:
+        """转换为 WHERE 条件列表与参数；legacy 为 True 时同时匹配尚未回填的旧记录"""
+        conditions, params = [], []
+        if self.run_id is not None:
+            conditions.append("run_id = ?")
+            params.append(self.run_id)
+        time_conditions, time_params = _time_conditions(self.since, self.until, legacy)
+        conditions += time_conditions
+        params += time_params
+        if self.status:
+            conditions.append("status LIKE ?")
+            params.append(self.status.upper() + "%")
+        for value, codes, code_column, text_column in ((self.action, ACTION_CODES, "action_code", "action"),
+                                                       (self.item_type, ITEM_TYPE_CODES, "type_code", "item_type")):
+            if value:
+                if value in codes:
+                    # 尚未回填的旧记录只有文本列
+                    conditions.append(f"({code_column} = ? OR {text_column} = ?)")
+                    params += [codes[value], value]
+                else:
+                    conditions.append(f"{text_column} = ?")
+                    params.append(value)
+        if self.dest_path:
+            conditions.append("dest_path = ?")
+            params.append(self.dest_path)
+        if self.filename:
+            conditions.append("filename LIKE ? ESCAPE '\\'")
+            escaped = self.filename.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        return conditions, params
+
+
+_INSERT_SQL = '''
+    INSERT INTO history (ts, run_id, action_code, action, type_code, item_type, filename, source_path, dest_path, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
 
 class DBManager:
-    def __init__(self, db_file, exe_dir):
+    def __init__(self, db_file, exe_dir, batch_size=500, flush_interval_ms=200):
+        """
+        Args:
+            db_file: 数据库文件路径
+            exe_dir: 导出 CSV 的目录
+            batch_size: 缓冲写入时每个事务最多提交的行数，1 表示每行同步提交
+            flush_interval_ms: 缓冲写入时最长等待多少毫秒提交一次
+        """
         self.db_file = db_file
         self.exe_dir = exe_dir
         self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
         self.cursor = self.conn.cursor()
+        # WAL 模式下提交只追加日志，synchronous=NORMAL 时只在检查点 fsync
+        try:
+            self.cursor.execute('PRAGMA journal_mode=WAL')
+            self.cursor.execute('PRAGMA synchronous=NORMAL')
+        except sqlite3.DatabaseError as e:
+            logging.warning(f"无法启用 WAL 模式: {e}")
         self.init_table()
         self.lock = threading.Lock()
+        # 超出保留数量的记录的压缩存档（位于数据库同目录）
+        self.archive = HistoryArchive(os.path.join(os.path.dirname(os.path.abspath(db_file)), "history_archive"))
+        # 当前运行编号，log 写入的记录都关联到这次运行
+        self.current_run_id = None
+        # 每次运行的 [成功数, 失败数]，在 log 时累计（历史记录可能在运行结束前已被清理）
+        self._run_counts = {}
+        self._counts_lock = threading.Lock()
+
+        # v2 之前的记录（ts 为空）由后台线程分批回填，不阻塞启动；回填完成前读取时兼容只有文本列的记录
+        self._closing = threading.Event()
+        self._backfill = None
+        self._backfill_pending = self.cursor.execute('SELECT 1 FROM history WHERE ts IS NULL LIMIT 1').fetchone() is not None
+        if self._backfill_pending:
+            self._backfill = threading.Thread(target=self._backfill_loop, name="history-backfill", daemon=True)
+            self._backfill.start()
+
+        # 缓冲写入：log 只把记录放入队列，由后台线程批量写入
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0, flush_interval_ms) / 1000
+        self._queue = queue.Queue()
+        self._writer = None
+        # 每个线程一个只读连接，查询不经过 self.lock
+        self._local = threading.local()
+        self._readers = []  # [(线程, 连接)]
+        self._readers_lock = threading.Lock()
+        if self.batch_size > 1:
+            self._writer = threading.Thread(target=self._writer_loop, name="history-writer", daemon=True)
+            self._writer.start()
 
     def init_table(self):
+        """按 PRAGMA user_version 依次执行尚未执行的结构迁移"""
+        version = self.cursor.execute('PRAGMA user_version').fetchone()[0]
+        if version == 0 and not self.cursor.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()[0]:
+            # 新数据库在建表前切换（已启用 WAL，需 VACUUM 一次，空库瞬间完成）
+            self.cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            self.cursor.execute('VACUUM')
+        for target, migrate in ((1, self._migrate_v1), (2, self._migrate_v2), (3, self._migrate_v3),
+                                 (4, self._migrate_v4)):
+            if version < target:
+                migrate()
+                self.cursor.execute(f'PRAGMA user_version = {target}')
+                self.conn.commit()
+
+    def _migrate_v1(self):
+        """初始结构"""
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -27,58 +240,644 @@ class DBManager:
                 status TEXT
             )
         ''')
-        self.conn.commit()
+
+    def _migrate_v2(self):
+        """运行记录表与 run_id、整数时间戳、操作/类型代码，以及按运行、目标路径、时间查询的索引"""
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                action_code INTEGER,
+                started_at INTEGER,
+                finished_at INTEGER,
+                source_dir TEXT,
+                dry_run INTEGER DEFAULT 0,
+                items_succeeded INTEGER DEFAULT 0,
+                items_failed INTEGER DEFAULT 0
+            )
+        ''')
+        columns = {row[1] for row in self.cursor.execute('PRAGMA table_info(history)')}
+        for name, declaration in (("run_id", "INTEGER REFERENCES runs (id)"), ("ts", "INTEGER"),
+                                  ("action_code", "INTEGER"), ("type_code", "INTEGER")):
+            if name not in columns:
+                self.cursor.execute(f'ALTER TABLE history ADD COLUMN {name} {declaration}')
+        self.cursor.execute('DROP INDEX IF EXISTS idx_history_timestamp')
+        # 已有记录的回填在后台线程中进行，见 _backfill_loop
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_run ON history (run_id)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_dest ON history (dest_path)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_ts ON history (ts)')
+
+    def _migrate_v3(self):
+        """
+        启用增量自动回收：已有数据库需要 VACUUM 一次才能切换，
+        耗时与数据库大小成正比，不在启动时执行，而是推迟到之后第一次清理旧日志时（见 vacuum）
+        """
+        if self.cursor.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            self.cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
+    def _migrate_v4(self):
+        """增量导出的水位线"""
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS export_watermarks (
+                name TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL,
+                updated_at INTEGER
+            )
+        ''')
+
+    def _backfill_loop(self):
+        """后台线程：分批回填旧记录，文本时间转为整数，操作/类型转为代码（中途退出后下次启动会继续）"""
+        cursor = self.conn.cursor()
+        last_id = 0
+        while not self._closing.is_set():
+            with self.lock:
+                try:
+                    rows = cursor.execute('''
+                        SELECT id, timestamp, action, item_type FROM history
+                        WHERE ts IS NULL AND id > ? ORDER BY id LIMIT ?
+                    ''', (last_id, MIGRATION_BATCH)).fetchall()
+                    if not rows:
+                        self._backfill_pending = False
+                        return
+                    updates = []
+                    for row_id, timestamp, action, item_type in rows:
+                        try:
+                            ts = int(datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp())
+                        except (TypeError, ValueError):
+                            ts = None
+                        action_code = ACTION_CODES.get(action)
+                        type_code = ITEM_TYPE_CODES.get(item_type)
+                        updates.append((ts, None if ts is not None else timestamp,
+                                        action_code, None if action_code else action,
+                                        type_code, None if type_code else item_type, row_id))
+                    cursor.executemany('''
+                        UPDATE history SET ts = ?, timestamp = ?, action_code = ?, action = ?, type_code = ?,
+                            item_type = ?
+                        WHERE id = ?
+                    ''', updates)
+                    self.conn.commit()
+                except Exception as e:
+                    self.conn.rollback()
+                    logging.error(f"回填历史记录失败: {e}")
+                    return
+            last_id = rows[-1][0]
 
     def log(self, action, item_type, filename, src, dst, status="SUCCESS"):
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        action_code = ACTION_CODES.get(action)
+        type_code = ITEM_TYPE_CODES.get(item_type)
+        run_id = self.current_run_id
+        row = (int(time.time()), run_id, action_code, None if action_code else action,
+               type_code, None if type_code else item_type, filename, src, dst, status)
+        if run_id is not None and (status == "SUCCESS" or status.startswith("FAIL")):
+            with self._counts_lock:
+                counts = self._run_counts.setdefault(run_id, [0, 0])
+                counts[0 if status == "SUCCESS" else 1] += 1
+        if self._writer is None:
+            with self.lock:
+                try:
+                    self.cursor.execute(_INSERT_SQL, row)
+                    self.conn.commit()
+                except Exception as e:
+                    logging.error(f"数据库写入失败: {e}")
+            return
+        self._queue.put(row)
+        if status.startswith("FAIL"):
+            # 失败记录不等待攒满一批，立即提交
+            self._queue.put(threading.Event())
+
+    def _writer_loop(self):
+        """后台写入线程：攒满 batch_size 行或等待 flush_interval 后以一个事务写入"""
+        cursor = self.conn.cursor()
+        running = True
+        while running:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(cursor, batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _write_batch(self, cursor, batch):
         with self.lock:
             try:
-                self.cursor.execute('''
-                    INSERT INTO history (timestamp, action, item_type, filename, source_path, dest_path, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (now, action, item_type, filename, src, dst, status))
+                cursor.executemany(_INSERT_SQL, batch)
+                self.conn.commit()
+                return
+            except Exception as e:
+                self.conn.rollback()
+                logging.error(f"数据库批量写入失败: {e}")
+            # 逐行重试，个别行出错不影响同批的其他记录
+            for row in batch:
+                try:
+                    cursor.execute(_INSERT_SQL, row)
+                except Exception as e:
+                    logging.error(f"数据库写入失败: {e}")
+            try:
                 self.conn.commit()
             except Exception as e:
                 logging.error(f"数据库写入失败: {e}")
 
-    def cleanup_old_logs(self, retention_count):
-        """保留最近的 retention_count 条记录，删除其余记录"""
-        if retention_count <= 0:
+    def start_run(self, action, source_dir, dry_run=False):
+        """
+        开始一次运行，之后 log 写入的记录都关联到这次运行
+
+        Args:
+            action: 运行类型（整理、还原、监视）
+            source_dir: 源目录
+            dry_run: 是否为预演
+
+        Returns:
+            运行编号，失败时返回 None
+        """
+        with self.lock:
+            try:
+                self.cursor.execute('''
+                    INSERT INTO runs (action_code, started_at, source_dir, dry_run) VALUES (?, ?, ?, ?)
+                ''', (ACTION_CODES.get(action), int(time.time()), source_dir, int(bool(dry_run))))
+                self.conn.commit()
+                self.current_run_id = self.cursor.lastrowid
+            except Exception as e:
+                logging.error(f"创建运行记录失败: {e}")
+                self.current_run_id = None
+        return self.current_run_id
+
+    def finish_run(self, run_id):
+        """结束一次运行：记录结束时间，以及运行期间 log 累计的成功与失败数量"""
+        if run_id is None:
             return
+        self.flush()
+        with self._counts_lock:
+            succeeded, failed = self._run_counts.pop(run_id, (0, 0))
+        with self.lock:
+            try:
+                self.cursor.execute('''
+                    UPDATE runs SET finished_at = ?, items_succeeded = ?, items_failed = ? WHERE id = ?
+                ''', (int(time.time()), succeeded, failed, run_id))
+                self.conn.commit()
+            except Exception as e:
+                logging.error(f"更新运行记录失败: {e}")
+            if self.current_run_id == run_id:
+                self.current_run_id = None
+
+    def flush(self):
+        """等待队列中已记录的行全部提交（读取历史记录之前调用）"""
+        if self._writer is None or not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def iter_moves(self, after_id=0, batch_size=1000):
+        """
+        按 id 顺序分批读取 after_id 之后成功的整理记录
+
+        Yields:
+            (id, filename, item_type, dest_path)
+        """
+        self.flush()
+        while True:
+            with self.lock:
+                try:
+                    self.cursor.execute(f'''
+                        SELECT id, filename, {ITEM_TYPE_SQL}, dest_path FROM history
+                        WHERE id > ? AND (action_code = {ACTION_CODES["整理"]} OR action = '整理') AND status = 'SUCCESS'
+                        ORDER BY id LIMIT ?
+                    ''', (after_id, batch_size))
+                    rows = self.cursor.fetchall()
+                except Exception as e:
+                    logging.error(f"读取整理记录失败: {e}")
+                    return
+            if not rows:
+                return
+            yield from rows
+            after_id = rows[-1][0]
+
+    def iter_journal(self, run_id=None, since=None, until=None, batch_size=1000):
+        """
+        按 id 倒序分批读取成功的移动记录（整理以及去重产生的硬链接），用于按历史还原；
+        超出保留数量、已移入存档的旧记录在数据库中的记录之后同样按 id 倒序读取
+
+        Args:
+            run_id: 只读取该运行的记录，None 表示不限
+            since: 起始时间（含，Unix 时间戳），None 表示不限
+            until: 结束时间（含，Unix 时间戳），None 表示不限
+            batch_size: 每批读取的行数
+
+        Yields:
+            (id, ts, item_type, filename, source_path, dest_path)
+        """
+        self.flush()
+        legacy = self._backfill_pending
+        conditions = ["id >= ?", "id < ?", "status = 'SUCCESS'",
+                      f"(action_code IN ({ACTION_CODES['整理']}, {ACTION_CODES['去重']}) OR action IN ('整理', '去重'))"]
+        params = []
+        if run_id is not None:
+            conditions.append("run_id = ?")
+            params.append(run_id)
+        time_conditions, time_params = _time_conditions(since, until, legacy)
+        conditions += time_conditions
+        params += time_params
+
+        # 按时间筛选时先通过时间索引确定 id 范围，之后按主键倒序分批读取，不必扫描整张表（回填完成前不适用）
+        with self.lock:
+            try:
+                # 存档中 id 不小于此值的记录仍在数据库中（存档写入后、删除前中断时会重复）
+                first_live_id = self.cursor.execute("SELECT MIN(id) FROM history").fetchone()[0]
+                id_range = (0, None)
+                if (since is not None or until is not None) and not legacy:
+                    id_range = self._time_id_range(self.cursor, since, until)
+            except Exception as e:
+                logging.error(f"读取整理记录失败: {e}")
+                return
+        if id_range is not None:
+            low_id, high_id = id_range
+            yield from self._iter_live_journal(conditions, params, low_id, high_id, batch_size)
+        yield from self._iter_archived_journal(run_id, since, until, first_live_id)
+
+    def _iter_live_journal(self, conditions, params, low_id, high_id, batch_size):
+        sql = f'''
+            SELECT id, ts, {ITEM_TYPE_SQL}, filename, source_path, dest_path FROM history
+            WHERE {" AND ".join(conditions)}
+            ORDER BY id DESC LIMIT ?
+        '''
+        before_id = high_id + 1 if high_id is not None else 2 ** 62
+        while True:
+            with self.lock:
+                try:
+                    self.cursor.execute(sql, (low_id, before_id, *params, batch_size))
+                    rows = self.cursor.fetchall()
+                except Exception as e:
+                    logging.error(f"读取整理记录失败: {e}")
+                    return
+            if not rows:
+                return
+            yield from rows
+            before_id = rows[-1][0]
+
+    def _iter_archived_journal(self, run_id, since, until, first_live_id):
+        actions = ("整理", "去重")
+        for row_id, time_text, action, item_type, filename, src, dst, status, _ in self.archive.iter_rows(
+                run_id=run_id, since=format_time(since), until=format_time(until), status="SUCCESS",
+                descending=True):
+            if first_live_id is not None and (row_id or 0) >= first_live_id:
+                continue
+            if action not in actions or status != "SUCCESS":
+                continue
+            try:
+                ts = parse_time(time_text)
+            except ValueError:
+                ts = None
+            yield row_id, ts, item_type, filename, src, dst
+
+    def cleanup_old_logs(self, retention_count, archive=False):
+        """
+        保留最近的 retention_count 条记录，分块删除其余记录，之后增量回收空闲页
+
+        Args:
+            retention_count: 保留的记录数，0 表示不清理
+            archive: 删除前是否先写入按日期分区的压缩存档（导出时仍可读取）
+
+        Returns:
+            删除的记录数
+        """
+        if retention_count <= 0:
+            return 0
+        self.flush()
             
         with self.lock:
             try:
                 # 获取需要保留的最小 ID
-                self.cursor.execute(f'''
+                self.cursor.execute('''
                     SELECT id FROM history 
                     ORDER BY id DESC 
-                    LIMIT 1 OFFSET {retention_count - 1}
-                ''')
+                    LIMIT 1 OFFSET ?
+                ''', (retention_count - 1,))
                 result = self.cursor.fetchone()
-                
-                if result:
-                    min_id_to_keep = result[0]
-                    self.cursor.execute('DELETE FROM history WHERE id < ?', (min_id_to_keep,))
-                    self.conn.commit()
-                    logging.info(f"已清理旧日志，保留最近 {retention_count} 条记录")
             except Exception as e:
                 logging.error(f"清理旧日志失败: {e}")
+                return 0
+        if not result:
+            return 0
+        min_id_to_keep = result[0]
+
+        if archive:
+            select_sql = f'''
+                SELECT id, {TIME_SQL}, {ACTION_SQL}, {ITEM_TYPE_SQL}, filename, source_path, dest_path, status, run_id
+                FROM history WHERE id < ? ORDER BY id LIMIT ?
+            '''
+        else:
+            select_sql = 'SELECT id FROM history WHERE id < ? ORDER BY id LIMIT ?'
+        pruned = 0
+        while True:
+            with self.lock:
+                try:
+                    rows = self.cursor.execute(select_sql, (min_id_to_keep, PRUNE_CHUNK)).fetchall()
+                except Exception as e:
+                    logging.error(f"清理旧日志失败: {e}")
+                    break
+            if not rows:
+                break
+            if archive:
+                try:
+                    self.archive.write(rows)
+                except OSError as e:
+                    # 存档失败时不删除，避免记录丢失
+                    logging.error(f"写入历史存档失败: {e}")
+                    break
+            with self.lock:
+                try:
+                    self.cursor.execute('DELETE FROM history WHERE id <= ?', (rows[-1][0],))
+                    self.conn.commit()
+                except Exception as e:
+                    self.conn.rollback()
+                    logging.error(f"清理旧日志失败: {e}")
+                    break
+            pruned += len(rows)
+
+        if pruned:
+            logging.info(f"已清理旧日志 {pruned} 条，保留最近 {retention_count} 条记录" + ("（已写入存档）" if archive else ""))
+            self._incremental_vacuum()
+        return pruned
+
+    def vacuum(self):
+        """
+        完整 VACUUM 一次，重建数据库文件并切换到增量自动回收
+
+        Returns:
+            是否成功
+        """
+        self.flush()
+        with self.lock:
+            try:
+                # 回收模式的设置只对当前连接有效，VACUUM 后写入文件头
+                self.cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                self.cursor.execute('VACUUM')
+                logging.info("已整理数据库文件并启用增量自动回收")
+                return True
+            except Exception as e:
+                logging.error(f"整理数据库文件失败: {e}")
+                return False
+
+    def _incremental_vacuum(self):
+        """分步回收空闲页，使数据库文件随清理缩小；旧版本创建的数据库先完整 VACUUM 一次"""
+        with self.lock:
+            try:
+                pending = self.cursor.execute('PRAGMA auto_vacuum').fetchone()[0] != 2
+            except Exception as e:
+                logging.error(f"回收数据库空间失败: {e}")
+                return
+        if pending:
+            self.vacuum()
+            return
+        while True:
+            with self.lock:
+                try:
+                    free_pages = self.cursor.execute('PRAGMA freelist_count').fetchone()[0]
+                    if not free_pages:
+                        return
+                    self.cursor.execute(f'PRAGMA incremental_vacuum({min(free_pages, VACUUM_STEP_PAGES)})').fetchall()
+                    self.conn.commit()
+                    if self.cursor.execute('PRAGMA freelist_count').fetchone()[0] >= free_pages:
+                        return
+                except Exception as e:
+                    logging.error(f"回收数据库空间失败: {e}")
+                    return
+
+    def _read_connection(self):
+        """只读连接：WAL 模式下读到的是一致的快照，读取期间不持有 self.lock，也不阻塞写入线程"""
+        uri = pathlib.Path(os.path.abspath(self.db_file)).as_uri() + "?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def _reader(self):
+        """当前线程的只读连接（首次使用时创建）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._read_connection()
+            with self._readers_lock:
+                # 顺便关闭已结束线程留下的连接（界面每次操作都在新线程中执行）
+                for thread, reader in self._readers:
+                    if not thread.is_alive():
+                        reader.close()
+                self._readers = [(t, r) for t, r in self._readers if t.is_alive()]
+                self._readers.append((threading.current_thread(), conn))
+        return conn
+
+    @staticmethod
+    def _time_id_range(cursor, since, until):
+        """通过时间索引确定时间范围对应的 id 范围，之后只需按主键扫描；范围内没有记录时返回 None"""
+        cursor.execute('''
+            SELECT MIN(id), MAX(id) FROM history WHERE ts >= ? AND ts <= ?
+        ''', (since if since is not None else 0, until if until is not None else 2 ** 62))
+        low_id, high_id = cursor.fetchone()
+        return None if low_id is None else (low_id, high_id)
+
+    def query_history(self, filters: Optional[HistoryFilter] = None, after_id: int = 0, limit: int = 100,
+                      descending: bool = False) -> Iterator[HistoryRow]:
+        """
+        分页查询历史记录（键集分页）：按 id 排序（按时间筛选时按 (时间, id) 排序），下一页传入本页最后一条记录的 id，
+        每页只读取 limit 行，与已翻过的页数及时间范围的大小无关。
+        使用当前线程的只读连接，不经过 self.lock，也不等待写入线程（缓冲中的记录在 DB_FLUSH_MS 内可见）
+
+        Args:
+            filters: 筛选条件
+            after_id: 上一页最后一条记录的 id，0 表示第一页（倒序时表示只返回 id 更小的记录）
+            limit: 每页行数，最多 QUERY_MAX_LIMIT
+            descending: 是否从最新的记录开始
+
+        Returns:
+            HistoryRow 迭代器
+        """
+        filters = filters or HistoryFilter()
+        limit = max(1, min(limit, QUERY_MAX_LIMIT))
+        direction, compare = ("DESC", "<") if descending else ("ASC", ">")
+        try:
+            cursor = self._reader().cursor()
+            legacy = self._backfill_pending
+            # 回填完成前 ts 可能为空，按 id 排序
+            by_time = (filters.since is not None or filters.until is not None) and not legacy
+            cursor_ts = None
+            if by_time and after_id:
+                row = cursor.execute('SELECT ts FROM history WHERE id = ?', (after_id,)).fetchone()
+                cursor_ts = row[0] if row else None
+            if cursor_ts is not None:
+                # 上一页的位置已在时间范围内时，用它代替范围的起点（倒序时为终点），
+                # 在时间索引 (ts, id) 上直接定位，不必扫描范围内已翻过的记录
+                if descending and (filters.until is None or cursor_ts <= filters.until):
+                    filters = replace(filters, until=None)
+                elif not descending and (filters.since is None or cursor_ts >= filters.since):
+                    filters = replace(filters, since=None)
+            conditions, params = filters.to_sql(legacy)
+            if cursor_ts is not None:
+                conditions.append(f"(ts, id) {compare} (?, ?)")
+                params += [cursor_ts, after_id]
+            elif after_id or not descending:
+                conditions.append(f"id {compare} ?")
+                params.append(after_id)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            order = f"ts {direction}, id {direction}" if by_time else f"id {direction}"
+            cursor.execute(f'''
+                SELECT id, {TIME_SQL}, {ACTION_SQL}, {ITEM_TYPE_SQL}, filename, source_path, dest_path, status, run_id
+                FROM history {where}
+                ORDER BY {order} LIMIT ?
+            ''', (*params, limit))
+            rows = cursor.fetchall()
+        except Exception as e:
+            logging.error(f"查询历史记录失败: {e}")
+            return iter(())
+        return (HistoryRow(*row) for row in rows)
+
+    def get_watermark(self, name="default"):
+        """增量导出已导出到的记录 id"""
+        with self.lock:
+            try:
+                row = self.cursor.execute('SELECT last_id FROM export_watermarks WHERE name = ?', (name,)).fetchone()
+            except Exception as e:
+                logging.error(f"读取导出水位线失败: {e}")
+                row = None
+        return row[0] if row else 0
 
-    def export_csv(self):
-        csv_file = os.path.join(self.exe_dir, f"整理记录导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    def set_watermark(self, name, last_id):
         with self.lock:
             try:
-                self.cursor.execute("SELECT * FROM history")
-                rows = self.cursor.fetchall()
-                
-                with open(csv_file, 'w', newline='', encoding='utf-8-sig') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(['ID', '时间', '操作', '类型', '文件名', '源路径', '目标路径', '状态'])
-                    writer.writerows(rows)
-                return csv_file
+                self.cursor.execute('''
+                    INSERT INTO export_watermarks (name, last_id, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id, updated_at = excluded.updated_at
+                ''', (name, last_id, int(time.time())))
+                self.conn.commit()
             except Exception as e:
-                logging.error(f"导出 CSV 失败: {e}")
-                return None
+                logging.error(f"保存导出水位线失败: {e}")
+
+    @staticmethod
+    def _watermark_key(name, run_id=None, since=None, until=None, status=None):
+        """带筛选条件的增量导出使用各自的水位线，不带条件时沿用原名称"""
+        parts = [f"{key}={value}" for key, value in
+                 (("run", run_id), ("since", since), ("until", until), ("status", status)) if value is not None]
+        return "|".join([name, *parts]) if parts else name
+
+    def export_history(self, path=None, fmt="csv", run_id=None, since=None, until=None, status=None,
+                       incremental=False, include_archive=True, watermark="default"):
+        """
+        流式导出历史记录：从只读连接逐批读取并写入文件，不把结果集读入内存
+
+        Args:
+            path: 输出文件路径，默认在 exe_dir 下按时间命名
+            fmt: 格式，csv、csv.gz、jsonl 或 jsonl.gz
+            run_id: 只导出该运行的记录
+            since: 起始时间（含，Unix 时间戳）
+            until: 结束时间（含，Unix 时间戳）
+            status: 只导出状态以此开头的记录（如 SUCCESS、FAIL、SKIP）
+            incremental: 只导出上次增量导出之后的新记录，成功后更新水位线（每组筛选条件各有一条水位线）
+            include_archive: 是否包含已清理到存档中的旧记录（排在数据库记录之前）
+            watermark: 增量导出的水位线名称，不同的导出目标可各自维护
+
+        Returns:
+            (导出文件路径, 导出的行数)，失败时路径为 None
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}（可选 {', '.join(EXPORT_FORMATS)}）")
+        self.flush()
+        if incremental:
+            # 水位线只推进到筛选后的最后一条记录，不同筛选条件共用会漏掉其他条件下的记录
+            watermark = self._watermark_key(watermark, run_id, since, until, status)
+        after_id = self.get_watermark(watermark) if incremental else 0
+        if path is None:
+            path = os.path.join(self.exe_dir, f"整理记录导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}")
+
+        legacy = self._backfill_pending
+        conditions, params = HistoryFilter(run_id=run_id, since=since, until=until, status=status).to_sql(legacy)
+        conditions.insert(0, "id > ?")
+        params.insert(0, after_id)
+
+        exported, last_id = 0, after_id
+        try:
+            conn = self._read_connection()
+            try:
+                cursor = conn.cursor()
+                # 在同一个读事务中读取，导出期间清理移入存档的记录仍能从数据库读到
+                cursor.execute("BEGIN")
+                first_live_id = cursor.execute("SELECT MIN(id) FROM history").fetchone()[0]
+                with ExportWriter(path, fmt) as writer:
+                    # 存档中只有 id 小于数据库中最小 id 的记录，水位线已越过时不必解压存档
+                    if include_archive and (first_live_id is None or after_id < first_live_id - 1):
+                        archived = []
+                        for row in self.archive.iter_rows(after_id, run_id, format_time(since), format_time(until),
+                                                          status):
+                            if first_live_id is not None and (row[0] or 0) >= first_live_id:
+                                continue  # 存档写入后、删除前中断时留下的重复记录
+                            archived.append(row)
+                            if len(archived) >= EXPORT_CHUNK:
+                                writer.write_rows(archived)
+                                exported += len(archived)
+                                archived = []
+                            last_id = max(last_id, row[0] or 0)
+                        writer.write_rows(archived)
+                        exported += len(archived)
+
+                    if (since is not None or until is not None) and not legacy:
+                        # 按时间筛选时先限定 id 范围，按主键顺序读取，无需对结果排序
+                        conditions += ["id >= ?", "id <= ?"]
+                        params += list(self._time_id_range(cursor, since, until) or (1, 0))
+                    cursor.execute(f'''
+                        SELECT id, {TIME_SQL}, {ACTION_SQL}, {ITEM_TYPE_SQL}, filename, source_path, dest_path, status, run_id
+                        FROM history WHERE {" AND ".join(conditions)} ORDER BY id
+                    ''', params)
+                    while True:
+                        rows = cursor.fetchmany(EXPORT_CHUNK)
+                        if not rows:
+                            break
+                        writer.write_rows(rows)
+                        exported += len(rows)
+                        last_id = max(last_id, rows[-1][0])
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.error(f"导出历史记录失败: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None, 0
+
+        if incremental and last_id > after_id:
+            self.set_watermark(watermark, last_id)
+        return path, exported
+
+    def export_csv(self, include_archive=True):
+        """
+        导出全部历史记录为 CSV
+
+        Args:
+            include_archive: 是否包含已清理到存档中的旧记录
+
+        Returns:
+            导出文件的路径，失败返回 None
+        """
+        return self.export_history(fmt="csv", include_archive=include_archive)[0]
 
     def close(self):
+        """提交缓冲中的记录后关闭连接（未完成的回填下次启动时继续）"""
+        self._closing.set()
+        if self._backfill is not None:
+            self._backfill.join()
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        with self._readers_lock:
+            for _, reader in self._readers:
+                reader.close()
+            self._readers.clear()
         self.conn.close()
@@ -0,0 +1,177 @@
+"""
+Dedupe - 基于内容哈希的重复文件检测
+逐级过滤，绝大多数文件不会被完整读取：
+1. 先按文件大小分组，大小唯一的文件直接判定为不重复
+2. 大小相同时比较开头和结尾各 HEAD_TAIL_BYTES 字节的摘要
+3. 首尾也相同时才通过 mmap 流式计算完整哈希
+比较对象为本次运行中已保留的文件，以及目标分类文件夹中已有的文件（首次用到该文件夹时 scandir 一次）
+"""
+import os
+import mmap
+import hashlib
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+HEAD_TAIL_BYTES = 64 * 1024
+HASH_WINDOW = 8 * 1024 * 1024
+
+
+def _open_first(paths: Sequence[str]):
+    """依次尝试打开候选路径（文件可能正在从源路径移动到目标路径）"""
+    last_error = None
+    for path in paths:
+        try:
+            return open(path, 'rb')
+        except OSError as e:
+            last_error = e
+    raise last_error or FileNotFoundError(paths[0] if paths else "")
+
+
+def head_tail_digest(f, size: int) -> bytes:
+    """开头与结尾各 HEAD_TAIL_BYTES 字节的摘要（小文件即为完整内容）"""
+    h = hashlib.blake2b(digest_size=16)
+    f.seek(0)
+    h.update(f.read(min(size, HEAD_TAIL_BYTES)))
+    if size > HEAD_TAIL_BYTES:
+        f.seek(max(HEAD_TAIL_BYTES, size - HEAD_TAIL_BYTES))
+        h.update(f.read(HEAD_TAIL_BYTES))
+    return h.digest()
+
+
+def full_digest(f, size: int) -> bytes:
+    """通过 mmap 按窗口流式计算完整哈希，不把整个文件读入内存"""
+    h = hashlib.blake2b()
+    if size == 0:
+        return h.digest()
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            for offset in range(0, len(mm), HASH_WINDOW):
+                h.update(view[offset:offset + HASH_WINDOW])
+        finally:
+            view.release()
+    return h.digest()
+
+
+class _Candidate:
+    """一个已保留的文件：可能的路径（源路径/目标路径）及缓存的摘要"""
+
+    __slots__ = ("paths", "head_tail", "full")
+
+    def __init__(self, paths: Tuple[str, ...]):
+        self.paths = paths
+        self.head_tail = None
+        self.full = None
+
+
+class DuplicateFinder:
+    """在本次运行中逐个检查文件是否与已保留的文件内容相同"""
+
+    def __init__(self, min_size: int = 1):
+        """
+        Args:
+            min_size: 参与检测的最小文件大小（字节），空文件默认不检测
+        """
+        self.min_size = min_size
+        self._by_size: Dict[int, List[_Candidate]] = {}
+        self._loaded_dirs = set()
+        self._lock = threading.Lock()
+        self._last_checked: Optional[_Candidate] = None
+        self.files_checked = 0
+        self.bytes_fully_hashed = 0
+        self.duplicates_found = 0
+
+    def _load_dir(self, directory: str):
+        """把目标文件夹中已有文件按大小登记（每个文件夹只 scandir 一次）"""
+        key = os.path.normcase(os.path.abspath(directory))
+        if key in self._loaded_dirs:
+            return
+        self._loaded_dirs.add(key)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            size = entry.stat(follow_symlinks=False).st_size
+                            if size >= self.min_size:
+                                self._by_size.setdefault(size, []).append(_Candidate((entry.path,)))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+
+    def _digest(self, candidate: _Candidate, size: int, full: bool) -> Optional[bytes]:
+        cached = candidate.full if full else candidate.head_tail
+        if cached is not None:
+            return cached
+        try:
+            with _open_first(candidate.paths) as f:
+                if full:
+                    candidate.full = full_digest(f, size)
+                    self.bytes_fully_hashed += size
+                    return candidate.full
+                candidate.head_tail = head_tail_digest(f, size)
+                return candidate.head_tail
+        except (OSError, ValueError):
+            return None
+
+    def find(self, path: str, size: Optional[int], dest_dir: Optional[str] = None) -> Optional[str]:
+        """
+        查找与 path 内容相同的已保留文件
+
+        Args:
+            path: 待检查的文件
+            size: 文件大小，None 表示文件夹（不检测）
+            dest_dir: 文件计划移入的目标文件夹，其中已有的文件也参与比较
+
+        Returns:
+            内容相同的文件路径，没有则返回 None
+        """
+        if size is None or size < self.min_size:
+            return None
+        with self._lock:
+            self.files_checked += 1
+            if dest_dir:
+                self._load_dir(dest_dir)
+            others = self._by_size.get(size)
+            if not others:
+                return None
+            me = self._last_checked = _Candidate((path,))
+            mine = self._digest(me, size, full=False)
+            if mine is None:
+                return None
+            for other in others:
+                if self._digest(other, size, full=False) != mine:
+                    continue
+                mine_full = self._digest(me, size, full=True)
+                if mine_full is not None and self._digest(other, size, full=True) == mine_full:
+                    self.duplicates_found += 1
+                    for candidate_path in other.paths[::-1]:
+                        if os.path.exists(candidate_path):
+                            return candidate_path
+                    return other.paths[-1]
+            return None
+
+    def add(self, size: Optional[int], *paths: str):
+        """
+        登记一个保留下来的文件
+
+        Args:
+            size: 文件大小
+            paths: 文件可能所在的路径（如移动前的源路径、移动后的目标路径）
+        """
+        if size is None or size < self.min_size:
+            return
+        with self._lock:
+            # 复用 find 时为同一文件计算的摘要
+            candidate = self._last_checked
+            if candidate is not None and paths and candidate.paths == (paths[0],):
+                candidate.paths = tuple(paths)
+            else:
+                candidate = _Candidate(tuple(paths))
+            self._last_checked = None
+            self._by_size.setdefault(size, []).append(candidate)
+
+    def stats_message(self) -> str:
+        return (f"重复检测: 检查 {self.files_checked} 个文件，发现 {self.duplicates_found} 个重复，"
+                f"完整读取 {self.bytes_fully_hashed / (1024 * 1024):.1f} MB")
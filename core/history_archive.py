@@ -0,0 +1,121 @@
+"""
+HistoryArchive - 超出保留数量的历史记录的冷存档
+按记录日期分区写入 gzip 压缩的 JSONL 文件（history-YYYY-MM-DD.jsonl.gz），
+每次清理以追加新的 gzip 成员的方式写入，导出时可按日期顺序读回（按时间筛选时跳过范围外的文件）
+"""
+import os
+import gzip
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+# 存档记录的字段（与导出 CSV 的列一一对应）
+ARCHIVE_FIELDS = ("id", "time", "action", "item_type", "filename", "source_path", "dest_path", "status", "run_id")
+
+# 压缩级别：存档以写入为主，6 比默认的 9 快数倍而体积相差很小
+COMPRESS_LEVEL = 6
+
+_PREFIX = "history-"
+_SUFFIX = ".jsonl.gz"
+
+
+class HistoryArchive:
+    """按日期分区的历史记录存档目录"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, date: str) -> str:
+        return os.path.join(self.directory, f"{_PREFIX}{date}{_SUFFIX}")
+
+    def write(self, rows: Iterable[Sequence]):
+        """
+        追加一批记录
+
+        Args:
+            rows: 按 ARCHIVE_FIELDS 顺序排列的记录，time 为 "YYYY-MM-DD HH:MM:SS"
+
+        Returns:
+            写入的记录数
+        """
+        partitions: Dict[str, List[str]] = {}
+        for row in rows:
+            time_text = row[1] or ""
+            date = time_text[:10] if len(time_text) >= 10 else "unknown"
+            partitions.setdefault(date, []).append(
+                json.dumps(dict(zip(ARCHIVE_FIELDS, row)), ensure_ascii=False)
+            )
+        if not partitions:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        count = 0
+        for date, lines in partitions.items():
+            with gzip.open(self._path(date), "at", compresslevel=COMPRESS_LEVEL, encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            count += len(lines)
+        return count
+
+    def files(self) -> List[str]:
+        """按日期排序的存档文件"""
+        try:
+            names = sorted(n for n in os.listdir(self.directory) if n.startswith(_PREFIX) and n.endswith(_SUFFIX))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, n) for n in names]
+
+    def iter_rows(self, after_id: int = 0, run_id: Optional[int] = None, since: Optional[str] = None,
+                  until: Optional[str] = None, status: Optional[str] = None,
+                  descending: bool = False) -> Iterator[tuple]:
+        """
+        按日期顺序逐行读取存档记录，损坏的行会被跳过
+
+        Args:
+            after_id: 只读取 id 大于此值的记录
+            run_id: 只读取该运行的记录
+            since: 起始时间（含），"YYYY-MM-DD HH:MM:SS"，日期更早的存档文件不会被打开
+            until: 结束时间（含）
+            status: 状态前缀（如 SUCCESS、FAIL、SKIP）
+            descending: 按 id 倒序读取（从最新的存档文件开始，每次只在内存中保留一个文件的匹配记录）
+
+        Yields:
+            按 ARCHIVE_FIELDS 顺序排列的记录
+        """
+        files = self.files()
+        if descending:
+            files.reverse()
+        for path in files:
+            date = os.path.basename(path)[len(_PREFIX):-len(_SUFFIX)]
+            if date == "unknown":
+                if since or until:
+                    continue
+            elif (since and date < since[:10]) or (until and date > until[:10]):
+                continue
+            rows = self._iter_file(path, after_id, run_id, since, until, status)
+            if descending:
+                rows = sorted(rows, key=lambda row: row[0] or 0, reverse=True)
+            yield from rows
+
+    @staticmethod
+    def _iter_file(path, after_id, run_id, since, until, status) -> Iterator[tuple]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if (record.get("id") or 0) <= after_id:
+                        continue
+                    if run_id is not None and record.get("run_id") != run_id:
+                        continue
+                    time_text = record.get("time") or ""
+                    if (since and time_text < since) or (until and time_text > until):
+                        continue
+                    if status and not (record.get("status") or "").upper().startswith(status.upper()):
+                        continue
+                    yield tuple(record.get(field) for field in ARCHIVE_FIELDS)
+        except (OSError, EOFError) as e:
+            # 写入中断留下的不完整 gzip 成员：已读出的记录保留，其余跳过
+            logging.error(f"读取历史存档失败 {os.path.basename(path)}: {e}")
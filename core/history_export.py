@@ -0,0 +1,50 @@
+"""
+HistoryExport - 历史记录导出文件的写入
+支持 csv、csv.gz、jsonl、jsonl.gz 四种格式，逐批写入，不在内存中保留整个结果集
+"""
+import csv
+import gzip
+import json
+from typing import Iterable, Sequence
+
+from .history_archive import ARCHIVE_FIELDS
+
+EXPORT_FORMATS = ("csv", "csv.gz", "jsonl", "jsonl.gz")
+# CSV 表头（列顺序与 ARCHIVE_FIELDS 一致）
+CSV_HEADER = ['ID', '时间', '操作', '类型', '文件名', '源路径', '目标路径', '状态', '运行编号']
+
+
+class ExportWriter:
+    """按格式写入导出文件，用作上下文管理器"""
+
+    def __init__(self, path: str, fmt: str = "csv"):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}（可选 {', '.join(EXPORT_FORMATS)}）")
+        self.path = path
+        self.fmt = fmt
+        self._file = None
+        self._csv = None
+
+    def __enter__(self):
+        # CSV 带 BOM，Excel 可直接识别中文
+        encoding = "utf-8-sig" if self.fmt.startswith("csv") else "utf-8"
+        if self.fmt.endswith(".gz"):
+            self._file = gzip.open(self.path, "wt", compresslevel=6, encoding=encoding, newline="")
+        else:
+            self._file = open(self.path, "w", encoding=encoding, newline="")
+        if self.fmt.startswith("csv"):
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(CSV_HEADER)
+        return self
+
+    def write_rows(self, rows: Iterable[Sequence]):
+        """写入一批按 ARCHIVE_FIELDS 顺序排列的记录"""
+        if self._csv is not None:
+            self._csv.writerows(rows)
+        else:
+            self._file.writelines(
+                json.dumps(dict(zip(ARCHIVE_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows
+            )
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
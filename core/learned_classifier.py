@@ -0,0 +1,190 @@
+"""
+LearnedClassifier - 基于历史记录训练的本地分类模型
+使用字符 n-gram + 词元特征的多项式朴素贝叶斯，从 history 表中成功的整理记录学习
+"文件名 -> 最终分类"，可增量训练并持久化到磁盘
+"""
+import os
+import re
+import gzip
+import json
+import math
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z]+|[0-9]+|[一-鿿]")
+
+# 预测时文件名中至少要有这么多已学过的特征（不含 type: 标记），且占全部特征的比例不低于 MIN_FEATURE_COVERAGE，
+# 否则证据几乎全部来自先验，不给出结果
+MIN_KNOWN_FEATURES = 3
+MIN_FEATURE_COVERAGE = 0.5
+
+
+def extract_features(filename: str, is_dir: bool = False) -> List[str]:
+    """
+    提取文件名特征
+
+    - 扩展名与文件/文件夹标记
+    - 词元：英文单词、数字（按位数归一）、单个汉字
+    - 文件名主体的字符 3-gram（首尾加边界符）
+    """
+    name = filename.lower()
+    stem, ext = (name, "") if is_dir else os.path.splitext(name)
+    features = ["type:dir" if is_dir else "type:file"]
+    if ext:
+        features.append("ext:" + ext)
+    for token in _TOKEN_RE.findall(stem):
+        if token.isdigit():
+            features.append(f"num:{len(token)}")
+        else:
+            features.append("tok:" + token)
+    padded = f"^{stem[:60]}$"
+    features.extend("ng:" + padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+
+class NaiveBayesModel:
+    """多项式朴素贝叶斯（拉普拉斯平滑），计数可直接累加，因此支持增量训练"""
+
+    VERSION = 1
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.doc_counts: Dict[str, int] = {}
+        self.feature_counts: Dict[str, Dict[str, int]] = {}
+        self.feature_totals: Dict[str, int] = {}
+        self.vocabulary: Dict[str, int] = {}
+        self.last_history_id = 0
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.doc_counts.values())
+
+    def learn(self, filename: str, is_dir: bool, category: str):
+        """加入一条训练样本"""
+        self.doc_counts[category] = self.doc_counts.get(category, 0) + 1
+        counts = self.feature_counts.setdefault(category, {})
+        features = extract_features(filename, is_dir)
+        for feature in features:
+            counts[feature] = counts.get(feature, 0) + 1
+            self.vocabulary[feature] = self.vocabulary.get(feature, 0) + 1
+        self.feature_totals[category] = self.feature_totals.get(category, 0) + len(features)
+
+    def predict(self, filename: str, is_dir: bool, categories: Iterable[str]) -> Tuple[Optional[str], float]:
+        """
+        在给定分类范围内预测。
+        置信度按均匀先验计算，各分类样本数量悬殊本身不会抬高置信度；
+        文件名中已学过的特征太少时（从未见过的名称）不给出结果
+
+        Returns:
+            (最可能的分类, 后验概率)，没有可用分类或证据不足时返回 (None, 0.0)
+        """
+        candidates = [c for c in categories if self.doc_counts.get(c)]
+        if not candidates:
+            return None, 0.0
+        distinctive = [f for f in extract_features(filename, is_dir) if not f.startswith("type:")]
+        features = [f for f in distinctive if f in self.vocabulary]
+        if len(features) < MIN_KNOWN_FEATURES or len(features) < len(distinctive) * MIN_FEATURE_COVERAGE:
+            return None, 0.0
+        vocab_size = len(self.vocabulary)
+        scores = []
+        for category in candidates:
+            counts = self.feature_counts.get(category, {})
+            denominator = math.log(self.feature_totals.get(category, 0) + self.alpha * vocab_size)
+            score = 0.0
+            for feature in features:
+                score += math.log(counts.get(feature, 0) + self.alpha) - denominator
+            scores.append(score)
+        best = max(scores)
+        norm = sum(math.exp(s - best) for s in scores)
+        idx = scores.index(best)
+        return candidates[idx], 1.0 / norm
+
+    def to_dict(self) -> dict:
+        return {
+            "version": self.VERSION,
+            "alpha": self.alpha,
+            "last_history_id": self.last_history_id,
+            "doc_counts": self.doc_counts,
+            "feature_counts": self.feature_counts,
+            "feature_totals": self.feature_totals,
+            "vocabulary": self.vocabulary,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NaiveBayesModel":
+        model = cls(alpha=data.get("alpha", 1.0))
+        if data.get("version") != cls.VERSION:
+            return model
+        model.last_history_id = data.get("last_history_id", 0)
+        model.doc_counts = data.get("doc_counts", {})
+        model.feature_counts = data.get("feature_counts", {})
+        model.feature_totals = data.get("feature_totals", {})
+        model.vocabulary = data.get("vocabulary", {})
+        return model
+
+
+class LearnedClassifier:
+    """负责模型的加载、保存以及从历史记录增量训练"""
+
+    def __init__(self, model_file: str, ignored_categories: Iterable[str] = ()):
+        """
+        Args:
+            model_file: 模型文件路径（gzip 压缩的 JSON）
+            ignored_categories: 不参与学习的分类（如兜底的默认分类）
+        """
+        self.model_file = model_file
+        self.ignored_categories = set(ignored_categories)
+        self._model = None
+
+    @property
+    def model(self) -> NaiveBayesModel:
+        """模型在首次使用时才从磁盘加载，不做分类的运行不必承担加载开销"""
+        if self._model is None:
+            self._model = self.load()
+        return self._model
+
+    def load(self) -> NaiveBayesModel:
+        if os.path.exists(self.model_file):
+            try:
+                with gzip.open(self.model_file, 'rt', encoding='utf-8') as f:
+                    return NaiveBayesModel.from_dict(json.load(f))
+            except Exception as e:
+                logging.error(f"加载本地分类模型失败: {e}")
+        return NaiveBayesModel()
+
+    def save(self):
+        tmp_file = self.model_file + ".tmp"
+        try:
+            with gzip.open(tmp_file, 'wt', encoding='utf-8') as f:
+                json.dump(self.model.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_file, self.model_file)
+        except Exception as e:
+            logging.error(f"保存本地分类模型失败: {e}")
+
+    def update_from_history(self, db) -> int:
+        """
+        从历史记录中读取上次训练之后新增的成功整理记录，增量训练；只有学到新样本时才保存
+
+        Args:
+            db: DBManager 实例
+
+        Returns:
+            新增的训练样本数
+        """
+        learned = 0
+        last_id = self.model.last_history_id
+        for row_id, filename, item_type, dest_path in db.iter_moves(after_id=last_id):
+            last_id = row_id
+            category = os.path.basename(os.path.dirname(dest_path or ""))
+            if not filename or not category or category in self.ignored_categories:
+                continue
+            self.model.learn(filename, item_type == "文件夹", category)
+            learned += 1
+        self.model.last_history_id = last_id
+        if learned:
+            self.save()
+        return learned
+
+    def predict(self, filename: str, is_dir: bool, categories: Iterable[str]) -> Tuple[Optional[str], float]:
+        """在给定分类范围内预测，返回 (分类, 置信度)"""
+        return self.model.predict(filename, is_dir, [c for c in categories if c not in self.ignored_categories])
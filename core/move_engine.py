@@ -0,0 +1,267 @@
+"""
+MoveEngine - 文件移动引擎
+同一设备上直接 os.rename；跨设备时在内核中按大块复制（copy_file_range，其次 sendfile，最后退化为大缓冲区读写），
+复制到带源文件签名的临时文件中，中断后再次移动同一文件会先核对已复制部分的内容，再从该位置继续；
+校验大小与首尾内容一致并落盘后才替换为目标文件并删除源文件
+"""
+import os
+import errno
+import shutil
+import hashlib
+from typing import Optional
+
+# 未完成复制的临时文件/文件夹后缀（整理和还原时都会跳过）
+PARTIAL_SUFFIX = ".aio_partial"
+# 单次内核复制的块大小
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+# 无法内核复制时的读写缓冲区大小
+BUFFER_SIZE = 8 * 1024 * 1024
+# 校验时比对的首尾字节数
+VERIFY_BYTES = 1024 * 1024
+
+# 内核复制不可用时返回的错误码（不支持、跨文件系统等），遇到后改用下一种方式
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF, errno.ENOTSUP,
+                    getattr(errno, "EOPNOTSUPP", errno.ENOTSUP)}
+
+
+def is_partial(name: str) -> bool:
+    """是否为移动引擎的未完成临时文件"""
+    return name.endswith(PARTIAL_SUFFIX)
+
+
+def _partial_path(dst: str, src: str, st: os.stat_result) -> str:
+    """临时文件名包含源路径、大小和修改时间的摘要，源文件变化后不会续传到旧的临时文件上"""
+    signature = f"{os.path.abspath(src)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8", "surrogatepass")
+    digest = hashlib.blake2b(signature, digest_size=6).hexdigest()
+    return f"{dst}.{digest}{PARTIAL_SUFFIX}"
+
+
+def _same_device(src: str, dst: str) -> bool:
+    try:
+        return os.lstat(src).st_dev == os.stat(os.path.dirname(os.path.abspath(dst))).st_dev
+    except OSError:
+        return False
+
+
+def _copy_range(fd_in: int, fd_out: int, offset: int, count: int) -> Optional[int]:
+    """使用 copy_file_range 复制，返回复制的字节数；不可用时返回 None"""
+    if not hasattr(os, "copy_file_range"):
+        return None
+    try:
+        return os.copy_file_range(fd_in, fd_out, count, offset, offset)
+    except OSError as e:
+        if e.errno in _FALLBACK_ERRNOS:
+            return None
+        raise
+
+
+def _send(fd_in: int, fd_out: int, offset: int, count: int) -> Optional[int]:
+    """使用 sendfile 复制（写入位置为目标文件当前位置），不可用时返回 None"""
+    if not hasattr(os, "sendfile"):
+        return None
+    try:
+        os.lseek(fd_out, offset, os.SEEK_SET)
+        return os.sendfile(fd_out, fd_in, offset, count)
+    except OSError as e:
+        if e.errno in _FALLBACK_ERRNOS:
+            return None
+        raise
+
+
+def _buffered(fd_in: int, fd_out: int, offset: int, count: int) -> int:
+    """用户态大缓冲区读写（Windows 及内核复制不可用时）"""
+    os.lseek(fd_in, offset, os.SEEK_SET)
+    os.lseek(fd_out, offset, os.SEEK_SET)
+    data = memoryview(os.read(fd_in, min(count, BUFFER_SIZE)))
+    written = 0
+    while written < len(data):
+        written += os.write(fd_out, data[written:])
+    return len(data)
+
+
+def _digest_range(fd: int, offset: int, length: int) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    os.lseek(fd, offset, os.SEEK_SET)
+    remaining = length
+    while remaining > 0:
+        chunk = os.read(fd, min(remaining, BUFFER_SIZE))
+        if not chunk:
+            break
+        h.update(chunk)
+        remaining -= len(chunk)
+    return h.digest()
+
+
+def _prefix_matches(src: str, partial: str, length: int) -> bool:
+    """续传前核对临时文件中已有的部分：崩溃后未落盘的页可能是全零，仅凭长度不可信"""
+    flags = os.O_RDONLY | getattr(os, "O_BINARY", 0)
+    fd_src = os.open(src, flags)
+    try:
+        fd_partial = os.open(partial, flags)
+        try:
+            return _digest_range(fd_src, 0, length) == _digest_range(fd_partial, 0, length)
+        finally:
+            os.close(fd_partial)
+    finally:
+        os.close(fd_src)
+
+
+def _fsync_file(path: str):
+    fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path: str):
+    """持久化目录项（重命名）；Windows 无法打开目录，跳过"""
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def verify_copy(src: str, dst: str) -> bool:
+    """比对大小以及开头、结尾各 VERIFY_BYTES 字节的摘要"""
+    size = os.path.getsize(src)
+    if os.path.getsize(dst) != size:
+        return False
+    head = min(size, VERIFY_BYTES)
+    tail_offset = max(head, size - VERIFY_BYTES)
+    flags = os.O_RDONLY | getattr(os, "O_BINARY", 0)
+    fd_src = os.open(src, flags)
+    try:
+        fd_dst = os.open(dst, flags)
+        try:
+            for offset, length in ((0, head), (tail_offset, size - tail_offset)):
+                if length and _digest_range(fd_src, offset, length) != _digest_range(fd_dst, offset, length):
+                    return False
+        finally:
+            os.close(fd_dst)
+    finally:
+        os.close(fd_src)
+    return True
+
+
+def copy_file(src: str, dst: str) -> str:
+    """
+    可续传的单文件复制：先写入临时文件，校验通过后再替换为 dst
+
+    Args:
+        src: 源文件
+        dst: 目标文件
+
+    Returns:
+        dst
+    """
+    st = os.stat(src)
+    partial = _partial_path(dst, src, st)
+    try:
+        offset = os.path.getsize(partial)
+    except OSError:
+        offset = 0
+    if offset > st.st_size:
+        offset = 0
+    if offset and not _prefix_matches(src, partial, offset):
+        offset = 0
+
+    fd_in = os.open(src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        fd_out = os.open(partial, os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.ftruncate(fd_out, offset)
+            use_range, use_send = True, True
+            while offset < st.st_size:
+                count = min(COPY_CHUNK_SIZE, st.st_size - offset)
+                n = None
+                if use_range:
+                    n = _copy_range(fd_in, fd_out, offset, count)
+                    use_range = n is not None
+                if n is None and use_send:
+                    n = _send(fd_in, fd_out, offset, count)
+                    use_send = n is not None
+                if n is None:
+                    n = _buffered(fd_in, fd_out, offset, count)
+                if n == 0:
+                    break  # 源文件在复制过程中被截断
+                offset += n
+            os.fsync(fd_out)
+        finally:
+            os.close(fd_out)
+    finally:
+        os.close(fd_in)
+
+    if not verify_copy(src, partial):
+        os.remove(partial)
+        raise OSError(errno.EIO, "复制校验失败，已保留源文件", src)
+    shutil.copystat(src, partial)
+    # 内容与元数据落盘后才重命名为目标文件，之后调用方才会删除源文件
+    _fsync_file(partial)
+    os.replace(partial, dst)
+    _fsync_dir(os.path.dirname(os.path.abspath(dst)))
+    return dst
+
+
+def _copy_tree(src: str, dst: str):
+    """复制文件夹到临时文件夹（逐文件续传与校验），完成后重命名为 dst"""
+    partial = _partial_path(dst, src, os.stat(src))
+    shutil.copytree(src, partial, symlinks=True, copy_function=copy_file, dirs_exist_ok=True)
+    _remove_stale(src, partial)
+    os.replace(partial, dst)
+
+
+def _remove_stale(src: str, partial: str):
+    """
+    续传后清理临时文件夹中的残留：中断后源文件被修改时会以新的签名重新复制，
+    旧签名的临时文件以及源中已不存在的项目不能跟随文件夹一起移到目标位置
+    """
+    for root, dirs, files in os.walk(partial):
+        rel = os.path.relpath(root, partial)
+        for name in dirs + files:
+            path = os.path.join(root, name)
+            if is_partial(name) or not os.path.lexists(os.path.join(src, rel, name)):
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                    dirs.remove(name)
+                else:
+                    os.remove(path)
+
+
+def move(src: str, dst: str) -> str:
+    """
+    移动文件或文件夹
+
+    同一设备直接重命名；跨设备时复制并校验后删除源文件。
+    跨设备复制中断后（进程退出、断电等），再次移动同一源到同一目标会从临时文件续传
+
+    Args:
+        src: 源路径
+        dst: 目标路径（调用方保证不存在）
+
+    Returns:
+        使用的方式："rename" 或 "copy"
+    """
+    if _same_device(src, dst):
+        try:
+            os.rename(src, dst)
+            return "rename"
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    if os.path.islink(src):
+        shutil.move(src, dst)
+        return "copy"
+    if os.path.isdir(src):
+        _copy_tree(src, dst)
+        shutil.rmtree(src)
+    else:
+        copy_file(src, dst)
+        os.remove(src)
+    return "copy"
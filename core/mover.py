@@ -0,0 +1,131 @@
+"""
+Mover - 并行移动执行器
+目标名称在提交时按顺序预留（保证重名处理的结果与串行执行一致），实际移动交给线程池；
+大文件与小文件使用独立的线程池，跨卷复制大文件时不会阻塞后面成千上万个小文件
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from . import move_engine
+from .name_index import DestinationNameIndex
+
+
+class MoveExecutor:
+    """按文件大小分流到两个线程池执行移动，并统计吞吐量"""
+
+    def __init__(self, workers: int = 4, large_workers: int = 1, large_threshold: int = 256 * 1024 * 1024,
+                 max_pending: int = 0, name_index: Optional[DestinationNameIndex] = None):
+        """
+        Args:
+            workers: 小文件线程池大小
+            large_workers: 大文件（及文件夹）线程池大小
+            large_threshold: 大文件阈值（字节）
+            max_pending: 每个线程池最多排队的任务数，超过时 submit 阻塞，0 表示线程数的 4 倍
+            name_index: 目标名称索引，不提供时新建
+        """
+        self.large_threshold = large_threshold
+        workers = max(1, workers)
+        large_workers = max(1, large_workers)
+        self._small_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="move")
+        self._large_pool = ThreadPoolExecutor(max_workers=large_workers, thread_name_prefix="move-large")
+        self._small_slots = threading.BoundedSemaphore(max_pending or workers * 4)
+        self._large_slots = threading.BoundedSemaphore(max_pending or large_workers * 4)
+        self.name_index = name_index if name_index is not None else DestinationNameIndex()
+        self._done_lock = threading.Lock()
+        self.files_moved = 0
+        self.files_failed = 0
+        self.files_renamed = 0  # 同一设备直接重命名的数量（其余为跨设备复制）
+        self.bytes_moved = 0
+        self._started = None  # 第一次提交时开始计时，不计入扫描和分类耗时
+        self._elapsed = None
+
+    def reserve(self, dest_dir: str, filename: str, suffix: str = "") -> str:
+        """
+        预留唯一的目标路径：已存在的文件和已提交但尚未完成的移动都视为占用
+
+        Args:
+            dest_dir: 目标目录
+            filename: 原文件名
+            suffix: 重名时插入的后缀前缀（如 "还原"）
+
+        Returns:
+            预留的目标路径
+        """
+        return self.name_index.reserve(dest_dir, filename, suffix)
+
+    def submit(self, source: str, dest: str, size: Optional[int],
+               on_done: Callable[[Optional[Exception]], None]):
+        """
+        提交一次移动；on_done(error) 在移动完成后调用（同一时刻只有一个回调在执行，可直接写日志和数据库）
+
+        Args:
+            source: 源路径
+            dest: 已通过 reserve 预留的目标路径
+            size: 文件大小（字节），None 表示文件夹或未知大小，按大文件处理
+            on_done: 完成回调，成功时参数为 None
+        """
+        if self._started is None:
+            self._started = time.monotonic()
+        large = size is None or size >= self.large_threshold
+        pool, slots = (self._large_pool, self._large_slots) if large else (self._small_pool, self._small_slots)
+        slots.acquire()
+        try:
+            pool.submit(self._move, source, dest, size, on_done, slots)
+        except Exception:
+            slots.release()
+            raise
+
+    def _move(self, source, dest, size, on_done, slots):
+        try:
+            error = None
+            try:
+                method = move_engine.move(source, dest)
+            except Exception as e:
+                error = e
+            with self._done_lock:
+                if error is None:
+                    self.files_moved += 1
+                    self.bytes_moved += size or 0
+                    if method == "rename":
+                        self.files_renamed += 1
+                else:
+                    self.files_failed += 1
+                    self.name_index.release(dest)
+                on_done(error)
+        finally:
+            slots.release()
+
+    def close(self):
+        """等待所有移动完成并释放线程池"""
+        self._small_pool.shutdown(wait=True)
+        self._large_pool.shutdown(wait=True)
+        if self._elapsed is None and self._started is not None:
+            self._elapsed = time.monotonic() - self._started
+
+    def throughput_message(self) -> str:
+        if self._elapsed is not None:
+            elapsed = self._elapsed
+        else:
+            elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+        elapsed = max(elapsed, 1e-6)
+        mb = self.bytes_moved / (1024 * 1024)
+        return (f"移动统计: 成功 {self.files_moved} 个（重命名 {self.files_renamed} 个，"
+                f"跨设备复制 {self.files_moved - self.files_renamed} 个），失败 {self.files_failed} 个，{mb:.1f} MB，"
+                f"耗时 {elapsed:.1f} 秒（{self.files_moved / elapsed:.1f} 个/秒，{mb / elapsed:.1f} MB/秒）")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def create_move_executor(config, name_index: Optional[DestinationNameIndex] = None) -> MoveExecutor:
+    """按配置文件中的 MOVE_WORKERS / MOVE_LARGE_WORKERS / MOVE_LARGE_THRESHOLD_MB 创建执行器"""
+    return MoveExecutor(
+        workers=config.getint('SETTINGS', 'MOVE_WORKERS', fallback=4),
+        large_workers=config.getint('SETTINGS', 'MOVE_LARGE_WORKERS', fallback=1),
+        large_threshold=int(config.getfloat('SETTINGS', 'MOVE_LARGE_THRESHOLD_MB', fallback=256) * 1024 * 1024),
+        name_index=name_index
+    )
@@ -0,0 +1,88 @@
+"""
+NameIndex - 目标目录的文件名索引
+每个目标目录第一次使用时用一次 scandir 读入已有名称，并记录每个基础名已用到的最大序号；
+之后的重名处理直接取下一个序号，不再逐个 os.path.exists 探测 name_1、name_2 ...
+"""
+import os
+import re
+import threading
+from typing import Dict, Set, Tuple
+
+# 解析已有的 "基础名_[后缀]序号.扩展名"，用于初始化每个基础名的下一个序号
+_NUMBERED_RE = re.compile(r"^(?P<base>.*)_(?P<suffix>\D*?)(?P<n>\d+)$")
+
+
+class DestinationNameIndex:
+    """线程安全的目标名称预留：同一目录的并行移动也不会分配到相同的名称"""
+
+    def __init__(self):
+        # 目录 -> (已占用名称集合, {(基础名, 扩展名, 后缀): 下一个序号})
+        self._dirs: Dict[str, Tuple[Set[str], Dict[Tuple[str, str, str], int]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return os.path.normcase(name)
+
+    def _load(self, dest_dir: str):
+        names = set()
+        counters = {}
+        try:
+            with os.scandir(dest_dir) as entries:
+                for entry in entries:
+                    names.add(self._key(entry.name))
+                    stem, ext = os.path.splitext(entry.name)
+                    match = _NUMBERED_RE.match(stem)
+                    if match:
+                        key = (self._key(match.group("base")), self._key(ext), match.group("suffix"))
+                        counters[key] = max(counters.get(key, 1), int(match.group("n")) + 1)
+        except FileNotFoundError:
+            pass
+        # 只保留原名本身也存在的序号（IMG_1234.jpg 不应让 IMG.jpg 的重名从 1235 开始）
+        counters = {key: n for key, n in counters.items() if key[0] + key[1] in names}
+        return names, counters
+
+    def reserve(self, dest_dir: str, filename: str, suffix: str = "") -> str:
+        """
+        预留唯一的目标路径
+
+        Args:
+            dest_dir: 目标目录
+            filename: 原文件名
+            suffix: 重名时插入在序号前的文字（如 "还原" 得到 name_还原1.ext）
+
+        Returns:
+            预留的目标路径
+        """
+        dir_key = self._key(os.path.abspath(dest_dir))
+        with self._lock:
+            state = self._dirs.get(dir_key)
+            if state is None:
+                state = self._dirs[dir_key] = self._load(dest_dir)
+            names, counters = state
+
+            candidate = filename
+            if self._key(candidate) in names:
+                base, ext = os.path.splitext(filename)
+                counter_key = (self._key(base), self._key(ext), suffix)
+                counter = counters.get(counter_key, 1)
+                while True:
+                    candidate = f"{base}_{suffix}{counter}{ext}"
+                    counter += 1
+                    if self._key(candidate) not in names:
+                        break
+                counters[counter_key] = counter
+            # 索引建立后目录可能被其他程序写入：对最终选中的名称再确认一次
+            dest_path = os.path.join(dest_dir, candidate)
+            names.add(self._key(candidate))
+        if os.path.lexists(dest_path):
+            return self.reserve(dest_dir, filename, suffix)
+        return dest_path
+
+    def release(self, dest_path: str):
+        """移动失败时释放预留的名称"""
+        dir_key = self._key(os.path.abspath(os.path.dirname(dest_path)))
+        with self._lock:
+            state = self._dirs.get(dir_key)
+            if state is not None:
+                state[0].discard(self._key(os.path.basename(dest_path)))
@@ -3,11 +3,27 @@ Organizer - 文件整理核心模块
 支持多种分类策略，便于扩展
 """
 import os
-import shutil
 import sys
+import stat
+import time
 import logging
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
 from .ai_client import AIClient
+from .ai_cache import AICache
+from .learned_classifier import LearnedClassifier
+from .rule_index import RuleIndex
+from .plan import PlanEntry, PlanWriter, read_plan
+from .content_sniffer import sniff_file
+from .clustering import cluster_names
+from .scanner import DirectoryScanner, ScanItem
+from .mover import MoveExecutor, create_move_executor
+from .name_index import DestinationNameIndex
+from .watcher import InotifyWatcher, SettleTracker, create_watcher
+from .dedupe import DuplicateFinder
 
 
 class ClassificationStrategy(ABC):
@@ -27,9 +43,42 @@ class ClassificationStrategy(ABC):
             分类名称，无法分类返回 None
         """
         pass
+    
+    def classify_batch(self, items: List[ScanItem], rules: dict) -> List[Optional[str]]:
+        """
+        批量分类，默认逐个调用 classify；需要合并请求的策略可重写此方法
+        
+        Args:
+            items: 待分类项目列表
+            rules: 分类规则字典
+            
+        Returns:
+            与 items 一一对应的分类列表，无法分类的位置为 None
+        """
+        return [self.classify(item.name, rules, item.is_dir) for item in items]
+
+
+class RuleIndexStrategy(ClassificationStrategy):
+    """基于预编译规则索引的策略基类"""
+    
+    def __init__(self, rule_index: Optional[RuleIndex] = None):
+        """
+        Args:
+            rule_index: 预编译的规则索引，不提供则按传入的 rules 自动编译并缓存
+        """
+        self.rule_index = rule_index
+        self._compiled_rules = None
+        
+    def _get_index(self, rules: dict) -> RuleIndex:
+        """获取规则索引，未预编译时按 rules 对象编译一次并缓存"""
+        if self.rule_index is not None:
+            return self.rule_index
+        if self._compiled_rules is None or self._compiled_rules[0] is not rules:
+            self._compiled_rules = (rules, RuleIndex(rules))
+        return self._compiled_rules[1]
 
 
-class ExtensionStrategy(ClassificationStrategy):
+class ExtensionStrategy(RuleIndexStrategy):
     """扩展名匹配策略"""
     
     def classify(self, filename: str, rules: dict, is_dir: bool = False) -> str:
@@ -38,37 +87,169 @@ class ExtensionStrategy(ClassificationStrategy):
             return None
             
         ext = os.path.splitext(filename)[1].lower()
-        for category, patterns in rules.items():
-            if ext in patterns:
-                return category
-        return None
+        return self._get_index(rules).match_extension(ext)
 
 
-class KeywordStrategy(ClassificationStrategy):
+class KeywordStrategy(RuleIndexStrategy):
     """关键词匹配策略"""
     
     def classify(self, filename: str, rules: dict, is_dir: bool = False) -> str:
-        """通过文件名中的关键词进行分类"""
-        for category, patterns in rules.items():
-            for pattern in patterns:
-                if pattern.lower() in filename.lower():
-                    return category
+        """通过文件名中的关键词进行分类（扩展名规则不参与关键词匹配）"""
+        return self._get_index(rules).match_keyword(filename)
+
+
+class ContentSniffStrategy(RuleIndexStrategy):
+    """文件头魔数识别策略：处理没有扩展名或扩展名不在规则中的文件"""
+    
+    def classify(self, filename: str, rules: dict, is_dir: bool = False) -> str:
+        """仅凭文件名无法读取内容，实际识别在 classify_batch 中按路径进行"""
+        return None
+    
+    def classify_batch(self, items: List[ScanItem], rules: dict) -> List[Optional[str]]:
+        """读取文件头（至多几 KB），将识别出的真实类型映射到规则中的分类"""
+        index = self._get_index(rules)
+        results = []
+        for item in items:
+            category = None
+            if (not item.is_dir and index.match_extension(os.path.splitext(item.name)[1].lower()) is None
+                    and self._is_regular(item)):
+                for ext in sniff_file(item.path) or ():
+                    category = index.match_extension(ext)
+                    if category:
+                        break
+            results.append(category)
+        return results
+    
+    @staticmethod
+    def _is_regular(item: ScanItem) -> bool:
+        """只读取普通文件：FIFO、设备等特殊文件打开或读取时可能阻塞"""
+        try:
+            return stat.S_ISREG(item.stat().st_mode)
+        except OSError:
+            return False
+
+
+class LearnedStrategy(ClassificationStrategy):
+    """本地学习模型策略：使用从历史记录训练的模型，仅在置信度足够高时给出结果"""
+    
+    def __init__(self, classifier: LearnedClassifier, db=None, threshold: float = 0.9, min_samples: int = 50):
+        """
+        Args:
+            classifier: 本地分类模型
+            db: 历史记录数据库，首次分类前用其中新增的整理记录增量训练，None 表示不训练
+            threshold: 最低置信度
+            min_samples: 模型至少需要的训练样本数
+        """
+        self.classifier = classifier
+        self.db = db
+        self.threshold = threshold
+        self.min_samples = min_samples
+        
+    def classify(self, filename: str, rules: dict, is_dir: bool = False) -> str:
+        """通过本地模型进行分类"""
+        if self.db is not None:
+            # 首次分类时才加载模型，并用上次运行后新增的历史记录增量训练
+            db, self.db = self.db, None
+            try:
+                self.classifier.update_from_history(db)
+            except Exception as e:
+                logging.error(f"本地分类模型训练失败: {e}")
+        if self.classifier.model.sample_count < self.min_samples:
+            return None
+        category, confidence = self.classifier.predict(filename, is_dir, rules.keys())
+        if category and confidence >= self.threshold:
+            return category
         return None
 
 
 class AIStrategy(ClassificationStrategy):
     """AI 分类策略"""
     
-    def __init__(self, ai_client: AIClient):
+    def __init__(self, ai_client: AIClient, batch_size: int = 1, cache: Optional[AICache] = None,
+                 concurrency: int = 1, defer_on_open_circuit: bool = False):
+        """
+        Args:
+            ai_client: AI 客户端
+            batch_size: 批量模式下每次请求包含的条目数，1 表示逐个请求
+            cache: AI 结果缓存，提供时先查缓存再请求 AI
+            concurrency: 同时进行的 AI 请求数
+            defer_on_open_circuit: 熔断期间被跳过的条目是否标记为推迟处理（否则交给默认分类）
+        """
         self.ai_client = ai_client
+        self.batch_size = max(1, batch_size)
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.defer_on_open_circuit = defer_on_open_circuit
         
     def classify(self, filename: str, rules: dict, is_dir: bool = False) -> str:
         """通过 AI 进行分类"""
         if not self.ai_client:
             return None
             
+        if self.cache is not None:
+            hit, cached = self.cache.get(filename, is_dir)
+            if hit:
+                return cached
+                
         ai_cat = self.ai_client.ask_ai(filename, rules.keys(), is_dir)
+        # 因熔断被跳过的结果不写入缓存，避免被当作"AI 无法识别"
+        if self.cache is not None and not self.ai_client.consume_skipped():
+            self.cache.put(filename, is_dir, ai_cat)
         return ai_cat
+    
+    def classify_batch(self, items: List[ScanItem], rules: dict) -> List[Optional[str]]:
+        """先查缓存，再将未命中的条目合并成批量请求并发交给 AI 分类，结果按输入顺序返回"""
+        if not self.ai_client:
+            return [None] * len(items)
+            
+        results = [None] * len(items)
+        pending = list(range(len(items)))
+        if self.cache is not None:
+            cached = self.cache.get_many([(item.name, item.is_dir) for item in items])
+            pending = []
+            for idx, (hit, category) in enumerate(cached):
+                if hit:
+                    results[idx] = category
+                else:
+                    pending.append(idx)
+        if not pending:
+            return results
+            
+        pairs = [(items[idx].name, items[idx].is_dir) for idx in pending]
+        rules_keys = list(rules.keys())
+        units = [pairs[start:start + self.batch_size] for start in range(0, len(pairs), self.batch_size)]
+        
+        def ask(unit):
+            self.ai_client.consume_skipped()
+            if len(unit) == 1 and self.batch_size == 1:
+                unit_answers = [self.ai_client.ask_ai(unit[0][0], rules_keys, unit[0][1])]
+            else:
+                unit_answers = self.ai_client.ask_ai_batch(unit, rules_keys)
+            return unit_answers, self.ai_client.consume_skipped()
+        
+        answers = []
+        skipped = []
+        if self.concurrency > 1 and len(units) > 1:
+            # pool.map 按提交顺序返回结果，保证结果与目录顺序一致
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(units))) as pool:
+                outcomes = list(pool.map(ask, units))
+        else:
+            outcomes = [ask(unit) for unit in units]
+        for unit, (unit_answers, unit_skipped) in zip(units, outcomes):
+            answers.extend(unit_answers)
+            skipped.extend([unit_skipped] * len(unit))
+                
+        for idx, answer, was_skipped in zip(pending, answers, skipped):
+            results[idx] = answer
+            # 熔断期间未得到结果的条目可推迟到下次运行
+            if was_skipped and answer is None and self.defer_on_open_circuit:
+                items[idx].deferred = True
+        if self.cache is not None:
+            # 因熔断被跳过的批次不写入缓存，避免被当作"AI 无法识别"
+            self.cache.put_many([(name, is_dir, answer)
+                                 for (name, is_dir), answer, was_skipped in zip(pairs, answers, skipped)
+                                 if not (was_skipped and answer is None)])
+        return results
 
 
 class DefaultStrategy(ClassificationStrategy):
@@ -84,7 +265,10 @@ class DefaultStrategy(ClassificationStrategy):
 class Organizer:
     """文件整理器 - 支持多种分类策略"""
     
-    def __init__(self, paths, config, rules, db, log_callback=None, api_key=None, dry_run=False):
+    def __init__(self, paths, config, rules, db, log_callback=None, api_key=None, dry_run=False,
+                 ai_client: Optional[AIClient] = None, recursive: Optional[bool] = None,
+                 max_depth: Optional[int] = None, include: Optional[List[str]] = None,
+                 exclude: Optional[List[str]] = None):
         self.paths = paths
         self.config = config
         self.rules = rules
@@ -92,18 +276,90 @@ class Organizer:
         self.log_callback = log_callback
         self.dry_run = dry_run
         
-        # 初始化 AI 客户端
-        api_key = api_key if api_key else self.config.get('SETTINGS', 'API_KEY', fallback='').strip()
-        base_url = self.config.get('SETTINGS', 'BASE_URL', fallback='https://api.deepseek.com').strip()
-        model = self.config.get('SETTINGS', 'MODEL', fallback='deepseek-chat').strip()
-        self.ai_client = AIClient(api_key, base_url, model, log_callback)
+        # 扫描范围：未指定时使用配置文件中的值
+        self.recursive = recursive if recursive is not None else self.config.getboolean('SETTINGS', 'RECURSIVE', fallback=False)
+        self.max_depth = max_depth if max_depth is not None else self.config.getint('SETTINGS', 'MAX_DEPTH', fallback=0)
+        self.include = include or []
+        self.exclude = exclude or []
+        self.scan_chunk_size = max(1, self.config.getint('SETTINGS', 'SCAN_CHUNK_SIZE', fallback=1000))
+        
+        # 初始化 AI 客户端（可由调用方传入长期复用的客户端）
+        concurrency = self.config.getint('SETTINGS', 'AI_CONCURRENCY', fallback=4)
+        if ai_client is None:
+            api_key = api_key if api_key else self.config.get('SETTINGS', 'API_KEY', fallback='').strip()
+            base_url = self.config.get('SETTINGS', 'BASE_URL', fallback='https://api.deepseek.com').strip()
+            model = self.config.get('SETTINGS', 'MODEL', fallback='deepseek-chat').strip()
+            ai_client = AIClient(
+                api_key, base_url, model, log_callback,
+                requests_per_minute=self.config.getint('SETTINGS', 'AI_RPM', fallback=60),
+                concurrency=concurrency,
+                circuit_threshold=self.config.getint('SETTINGS', 'AI_CIRCUIT_THRESHOLD', fallback=5),
+                circuit_cooldown=self.config.getfloat('SETTINGS', 'AI_CIRCUIT_COOLDOWN', fallback=60)
+            )
+        self.ai_client = ai_client
+        model = self.ai_client.model
+        batch_size = self.config.getint('SETTINGS', 'AI_BATCH_SIZE', fallback=50)
+        
+        # 初始化 AI 结果缓存（位于 history.db 同目录，TTL 设为 0 则禁用）
+        self.ai_cache = None
+        cache_ttl_days = self.config.getfloat('SETTINGS', 'AI_CACHE_TTL_DAYS', fallback=30)
+        if self.ai_client.enabled and cache_ttl_days > 0:
+            cache_file = self.paths.get("AI_CACHE_FILE") or os.path.join(os.path.dirname(self.paths["DB_FILE"]), "ai_cache.db")
+            try:
+                self.ai_cache = AICache(
+                    cache_file, model, self.rules.keys(),
+                    ttl=cache_ttl_days * 86400,
+                    negative_ttl=self.config.getfloat('SETTINGS', 'AI_CACHE_NEGATIVE_TTL_MINUTES', fallback=60) * 60,
+                    max_entries=self.config.getint('SETTINGS', 'AI_CACHE_MAX_ENTRIES', fallback=100000)
+                )
+            except Exception as e:
+                logging.error(f"AI 缓存初始化失败: {e}")
+        
+        # 本地学习模型（首次分类时才加载和训练）
+        self.learned_classifier = None
+        if self.config.getboolean('SETTINGS', 'ML_ENABLED', fallback=True):
+            model_file = self.paths.get("MODEL_FILE") or os.path.join(os.path.dirname(self.paths["DB_FILE"]), "classifier.json.gz")
+            try:
+                self.learned_classifier = LearnedClassifier(model_file, ignored_categories=[
+                    DefaultStrategy.DEFAULT_CATEGORY,
+                    self.config.get('SETTINGS', 'DEDUPE_CATEGORY', fallback='22_重复文件').strip()
+                ])
+            except Exception as e:
+                self.learned_classifier = None
+                logging.error(f"本地分类模型初始化失败: {e}")
+        
+        # 重复文件检测（默认关闭）
+        self.deduper = DuplicateFinder() if self.config.getboolean('SETTINGS', 'DEDUPE', fallback=False) else None
+        self.dedupe_action = self.config.get('SETTINGS', 'DEDUPE_ACTION', fallback='skip').strip().lower()
+        self.dedupe_category = self.config.get('SETTINGS', 'DEDUPE_CATEGORY', fallback='22_重复文件').strip()
+        
+        # 目标目录名称索引（本次运行内的所有重名处理共用）
+        self.name_index = DestinationNameIndex()
+        
+        # 相似文件名聚类阈值（0 表示关闭，每个项目单独询问 AI）
+        self.cluster_threshold = self.config.getfloat('SETTINGS', 'AI_CLUSTER_THRESHOLD', fallback=0.8)
+        
+        # 编译规则快照（本次整理期间只读）
+        self.rule_index = RuleIndex(self.rules)
         
         # 初始化分类策略链（按优先级顺序）
         self.strategies = [
-            ExtensionStrategy(),      # 1. 扩展名匹配
-            KeywordStrategy(),        # 2. 关键词匹配
-            AIStrategy(self.ai_client),  # 3. AI 识别
-            DefaultStrategy()         # 4. 默认分类
+            ExtensionStrategy(self.rule_index),  # 1. 扩展名匹配
+            KeywordStrategy(self.rule_index),    # 2. 关键词匹配
+        ]
+        if self.config.getboolean('SETTINGS', 'CONTENT_SNIFF', fallback=True):
+            self.strategies.append(ContentSniffStrategy(self.rule_index))  # 3. 文件头识别
+        if self.learned_classifier is not None:
+            self.strategies.append(LearnedStrategy(  # 4. 本地学习模型
+                self.learned_classifier, self.db,
+                threshold=self.config.getfloat('SETTINGS', 'ML_CONFIDENCE', fallback=0.9),
+                min_samples=self.config.getint('SETTINGS', 'ML_MIN_SAMPLES', fallback=50)
+            ))
+        self.strategies += [
+            AIStrategy(self.ai_client, batch_size, self.ai_cache, concurrency,  # 5. AI 识别
+                       defer_on_open_circuit=self.config.get('SETTINGS', 'AI_CIRCUIT_OPEN_ACTION',
+                                                             fallback='default').strip().lower() == 'defer'),
+            DefaultStrategy()         # 6. 默认分类
         ]
     
     def print_log(self, message):
@@ -111,17 +367,8 @@ class Organizer:
             self.log_callback(message)
 
     def get_unique_path(self, dest_dir, filename, suffix=""):
-        """生成唯一的目标路径，处理重名冲突"""
-        base, ext = os.path.splitext(filename)
-        counter = 1
-        new_filename = filename
-        dest_path = os.path.join(dest_dir, new_filename)
-        while os.path.exists(dest_path):
-            insert_str = f"_{suffix}{counter}" if suffix else f"_{counter}"
-            new_filename = f"{base}{insert_str}{ext}"
-            dest_path = os.path.join(dest_dir, new_filename)
-            counter += 1
-        return dest_path
+        """生成唯一的目标路径，处理重名冲突（通过目标目录名称索引，无需逐个探测）"""
+        return self.name_index.reserve(dest_dir, filename, suffix)
 
     def get_category(self, filename, is_dir=False):
         """
@@ -143,6 +390,70 @@ class Organizer:
         # 所有策略都失败，返回默认值
         return DefaultStrategy.DEFAULT_CATEGORY
 
+    def classify_items(self, items: List[ScanItem]) -> List[str]:
+        """
+        批量执行策略链：每个策略只处理前面策略未能分类的项目，
+        使 AI 策略可以把所有未命中规则的项目合并请求
+        
+        Args:
+            items: 待分类项目列表
+            
+        Returns:
+            与 items 一一对应的分类名称列表
+        """
+        return [category for category, _ in self.classify_items_with_strategy(items)]
+
+    def classify_items_with_strategy(self, items: List[ScanItem]) -> List[Tuple[str, str]]:
+        """
+        与 classify_items 相同，额外返回给出分类结果的策略名称
+        
+        Returns:
+            与 items 一一对应的 (分类名称, 策略名称) 列表
+        """
+        results = [(DefaultStrategy.DEFAULT_CATEGORY, DefaultStrategy.__name__)] * len(items)
+        pending = list(range(len(items)))
+        for strategy in self.strategies:
+            if not pending:
+                break
+            batch = [items[i] for i in pending]
+            if isinstance(strategy, AIStrategy) and strategy.ai_client.enabled and self.cluster_threshold > 0:
+                answers = self._classify_clustered(strategy, batch)
+            else:
+                answers = strategy.classify_batch(batch, self.rules)
+            still_pending = []
+            for idx, category in zip(pending, answers):
+                if category:
+                    results[idx] = (category, type(strategy).__name__)
+                else:
+                    still_pending.append(idx)
+            pending = still_pending
+        return results
+
+    def _classify_clustered(self, strategy: ClassificationStrategy, items: List[ScanItem]) -> List[Optional[str]]:
+        """
+        先把相似文件名聚类，每组只把代表项交给策略分类，结果应用到整组
+        
+        Returns:
+            与 items 一一对应的分类结果
+        """
+        clusters = cluster_names([(item.name, item.is_dir) for item in items], self.cluster_threshold)
+        if len(clusters) == len(items):
+            return strategy.classify_batch(items, self.rules)
+        
+        sizes = sorted((len(members) for members in clusters if len(members) > 1), reverse=True)
+        shown = ", ".join(str(size) for size in sizes[:10]) + (" ..." if len(sizes) > 10 else "")
+        self.print_log(f"相似文件名聚类: {len(items)} 个项目合并为 {len(clusters)} 组，"
+                       f"多成员组 {len(sizes)} 个（大小: {shown}）")
+        
+        representatives = [items[members[0]] for members in clusters]
+        answers = strategy.classify_batch(representatives, self.rules)
+        results = [None] * len(items)
+        for members, representative, answer in zip(clusters, representatives, answers):
+            for idx in members:
+                results[idx] = answer
+                items[idx].deferred = representative.deferred
+        return results
+
     def add_strategy(self, strategy: ClassificationStrategy, position: int = -1):
         """
         添加新的分类策略
@@ -157,85 +468,400 @@ class Organizer:
         else:
             self.strategies.insert(position, strategy)
 
-    def run(self):
-        """执行整理任务"""
+    def get_dest_dir(self, category):
+        """返回分类对应的目标目录"""
         source_dir = self.paths["EXE_DIR"]
         target_name = self.config.get('SETTINGS', 'TARGET_NAME', fallback='归档文件夹')
-        
-        self.print_log(f"=== 开始整理 ===")
-        self.print_log(f"工作目录: {source_dir}")
-        if self.dry_run: 
-            self.print_log("--- 预演模式 ---")
+        if target_name == 'NONE':
+            return os.path.join(source_dir, category)
+        return os.path.join(source_dir, target_name, category)
+
+    def scan_items(self) -> List[ScanItem]:
+        """扫描源目录，返回待整理的项目（已排除程序文件、归档文件夹和分类文件夹）"""
+        return list(self.iter_scan())
 
-        # 构建排除路径列表
+    def iter_scan(self) -> Iterator[ScanItem]:
+        """
+        逐个生成待整理的项目；递归模式下惰性遍历整棵目录树，
+        剪除归档文件夹与分类文件夹，文件夹本身不作为项目（达到最大深度的除外）
+        """
+        source_dir = self.paths["EXE_DIR"]
+        scanner = self.create_scanner()
+        if self.recursive:
+            scan_iter = scanner.walk(source_dir, self.max_depth)
+        else:
+            scan_iter = scanner.scan(source_dir)
+
+        # 扫描中一旦发现规则无法命中的项目，就在后台预热 AI 连接（此时才加载 openai SDK）
+        warm_up_pending = self.ai_client.enabled and self.config.getboolean('SETTINGS', 'AI_WARM_UP', fallback=True)
+
+        for scan_item in scan_iter:
+            if warm_up_pending and not self._matches_rules(scan_item):
+                self.ai_client.warm_up()
+                warm_up_pending = False
+            yield scan_item
+
+    def create_scanner(self) -> DirectoryScanner:
+        """按当前配置创建扫描器（排除程序文件、归档文件夹和分类文件夹）"""
+        source_dir = self.paths["EXE_DIR"]
+        target_name = self.config.get('SETTINGS', 'TARGET_NAME', fallback='归档文件夹')
+
+        # 构建排除路径（扫描器内部转换为集合，逐项检查为 O(1)）
         exclude_paths = [
-            os.path.abspath(sys.argv[0]),
-            os.path.abspath(self.paths["CONFIG_FILE"]),
-            os.path.abspath(self.paths["RULES_FILE"]),
-            os.path.abspath(self.paths["LOG_FILE"]),
-            os.path.abspath(self.paths["DB_FILE"])
+            sys.argv[0],
+            self.paths["CONFIG_FILE"],
+            self.paths["RULES_FILE"],
+            self.paths["LOG_FILE"],
+            self.paths["DB_FILE"]
         ]
+        for key in ("AI_CACHE_FILE", "MODEL_FILE"):
+            if self.paths.get(key):
+                exclude_paths.append(self.paths[key])
         if getattr(sys, 'frozen', False):
-            exclude_paths.append(os.path.abspath(sys.executable))
+            exclude_paths.append(sys.executable)
         
-        # 排除归档文件夹及其子目录
+        # 归档文件夹与分类文件夹：顶层按名称排除，递归时再按路径剪除整棵子树
+        categories = list(self.rules.keys())
+        categories.append(self.config.get('SETTINGS', 'DEDUPE_CATEGORY', fallback='22_重复文件').strip())
+        reserved_names = set(categories)
+        reserved_names.add(target_name)
         if target_name != 'NONE':
-            exclude_paths.append(os.path.abspath(os.path.join(source_dir, target_name)))
-        
-        for cat in self.rules.keys():
-            exclude_paths.append(os.path.abspath(os.path.join(source_dir, cat)))
-            if target_name != 'NONE':
-                exclude_paths.append(os.path.abspath(os.path.join(source_dir, target_name, cat)))
-
-        # 遍历并处理文件/文件夹
-        items_processed = 0
-        for item in os.listdir(source_dir):
-            source_path = os.path.join(source_dir, item)
-            abs_path = os.path.abspath(source_path)
-            
-            # 跳过排除的路径
-            if abs_path in exclude_paths: 
+            exclude_paths.append(os.path.join(source_dir, target_name))
+        for cat in categories:
+            exclude_paths.append(os.path.join(source_dir, cat))
+        return DirectoryScanner(exclude_paths, reserved_names, self.include, self.exclude)
+
+    def _matches_rules(self, item: ScanItem) -> bool:
+        """项目能否被扩展名或关键词规则直接分类（仅用于决定是否预热 AI 连接）"""
+        if not item.is_dir and self.rule_index.match_extension(os.path.splitext(item.name)[1].lower()):
+            return True
+        return self.rule_index.match_keyword(item.name) is not None
+
+    def iter_plan(self) -> Iterator[PlanEntry]:
+        """
+        扫描并分类，按目录顺序生成整理计划条目
+        
+        扫描结果按 SCAN_CHUNK_SIZE 分块流式处理，每块分类后立即产出条目，
+        目录树再大内存占用也只与块大小相关
+        
+        Yields:
+            PlanEntry 计划条目
+        """
+        scan_iter = self.iter_scan()
+        while True:
+            items = list(islice(scan_iter, self.scan_chunk_size))
+            if not items:
+                break
+            yield from self._plan_chunk(items)
+
+    def _plan_chunk(self, items: List[ScanItem]) -> Iterator[PlanEntry]:
+        """对一块扫描结果批量分类（规则未命中的项目合并交给 AI）并生成计划条目"""
+        for scan_item, (category, strategy) in zip(items, self.classify_items_with_strategy(items)):
+            if scan_item.deferred:
+                self.print_log(f"推迟: {scan_item.name} (AI 服务熔断中，下次运行再处理)")
                 continue
-            if item in self.rules.keys() or item == target_name: 
+            dest_dir = self.get_dest_dir(category)
+
+            # 防止循环移动（目标目录在源目录内部）
+            if scan_item.is_dir and os.path.abspath(dest_dir).startswith(os.path.abspath(scan_item.path)):
+                self.print_log(f"跳过: {scan_item.name} (目标在源文件夹内部)")
                 continue
 
-            is_dir = os.path.isdir(source_path)
-            item_type = "文件夹" if is_dir else "文件"
+            try:
+                size, mtime_ns = scan_item.stat_signature()
+            except OSError as e:
+                self.print_log(f"跳过: {scan_item.name} ({e})")
+                continue
+            yield PlanEntry(
+                source=scan_item.path,
+                category=category,
+                dest_dir=dest_dir,
+                dest=os.path.join(dest_dir, scan_item.name),
+                strategy=strategy,
+                is_dir=scan_item.is_dir,
+                size=size,
+                mtime_ns=mtime_ns
+            )
 
-            # 获取分类
-            category = self.get_category(item, is_dir)
-            
-            # 确定目标目录
-            if target_name == 'NONE':
-                dest_dir = os.path.join(source_dir, category)
+    def create_move_executor(self) -> MoveExecutor:
+        """按配置创建并行移动执行器（与 get_unique_path 共用目标名称索引）"""
+        return create_move_executor(self.config, self.name_index)
+
+    def submit_entry(self, executor: MoveExecutor, entry: PlanEntry):
+        """
+        提交单个计划条目的移动：目标名称在当前线程按顺序预留，移动完成后写入历史记录
+        
+        Args:
+            executor: 移动执行器
+            entry: 计划条目
+        """
+        # 确保目标目录存在
+        if not os.path.exists(entry.dest_dir): 
+            os.makedirs(entry.dest_dir)
+        # 预留唯一目标路径
+        dest_path = executor.reserve(entry.dest_dir, entry.name)
+        
+        def on_done(error):
+            if error is None:
+                self.print_log(f"移动: {entry.name} -> {entry.category}")
+                self.db.log("整理", entry.item_type, entry.name, entry.source, dest_path, "SUCCESS")
             else:
-                dest_dir = os.path.join(source_dir, target_name, category)
+                self.print_log(f"移动失败 {entry.name}: {error}")
+                self.db.log("整理", entry.item_type, entry.name, entry.source, dest_path, f"FAIL: {error}")
+        
+        executor.submit(entry.source, dest_path, entry.size, on_done)
+        return dest_path
 
-            # 防止循环移动（目标目录在源目录内部）
-            if is_dir and os.path.abspath(dest_dir).startswith(abs_path):
-                self.print_log(f"跳过: {item} (目标在源文件夹内部)")
-                continue
+    def process_entry(self, executor: Optional[MoveExecutor], entry: PlanEntry):
+        """
+        处理单个计划条目：预演时只输出，否则提交移动；
+        开启重复检测时先检查文件内容是否与已保留的文件相同
+        
+        Args:
+            executor: 移动执行器（预演模式为 None）
+            entry: 计划条目
+        """
+        if self.deduper is not None and not entry.is_dir:
+            original = self.deduper.find(entry.source, entry.size, entry.dest_dir)
+            if original is not None:
+                self._handle_duplicate(executor, entry, original)
+                return
+        
+        if self.dry_run:
+            self.print_log(f"[预演] {entry.item_type} '{entry.name}' -> '{entry.category}'")
+            dest_path = entry.dest
+        else:
+            dest_path = self.submit_entry(executor, entry)
+        if self.deduper is not None and not entry.is_dir:
+            self.deduper.add(entry.size, entry.source, dest_path)
+
+    def _handle_duplicate(self, executor: Optional[MoveExecutor], entry: PlanEntry, original: str):
+        """按 DEDUPE_ACTION 处理确认重复的文件：skip 留在原处，hardlink 以硬链接代替副本，move 移入重复文件分类"""
+        original_name = os.path.basename(original)
+        if self.dry_run:
+            self.print_log(f"[预演] 重复{entry.item_type} '{entry.name}' 与 '{original_name}' 内容相同 ({self.dedupe_action})")
+            return
+        
+        if self.dedupe_action == 'move':
+            dest_dir = self.get_dest_dir(self.dedupe_category)
+            self.submit_entry(executor, replace(
+                entry, category=self.dedupe_category, dest_dir=dest_dir,
+                dest=os.path.join(dest_dir, entry.name), strategy=DuplicateFinder.__name__
+            ))
+        elif self.dedupe_action == 'hardlink':
+            self._link_duplicate(executor, entry, original)
+        else:
+            self.print_log(f"跳过重复: {entry.name} (与 {original_name} 内容相同)")
+            self.db.log("去重", entry.item_type, entry.name, entry.source, original, f"SKIP: 与 {original} 内容相同")
+
+    def _link_duplicate(self, executor: MoveExecutor, entry: PlanEntry, original: str):
+        """在目标位置创建指向已保留文件的硬链接并删除副本；无法创建硬链接时按普通文件移动"""
+        if not os.path.exists(entry.dest_dir): 
+            os.makedirs(entry.dest_dir)
+        dest_path = executor.reserve(entry.dest_dir, entry.name)
+        try:
+            os.link(original, dest_path)
+        except OSError as e:
+            executor.name_index.release(dest_path)
+            self.print_log(f"无法创建硬链接 {entry.name} ({e})，按普通文件移动")
+            self.submit_entry(executor, entry)
+            return
+        try:
+            os.remove(entry.source)
+        except OSError as e:
+            os.remove(dest_path)
+            executor.name_index.release(dest_path)
+            self.print_log(f"去重失败 {entry.name}: {e}")
+            self.db.log("去重", entry.item_type, entry.name, entry.source, dest_path, f"FAIL: {e}")
+            return
+        self.print_log(f"硬链接: {entry.name} -> {entry.category} (与 {os.path.basename(original)} 内容相同)")
+        self.db.log("去重", entry.item_type, entry.name, entry.source, dest_path, "SUCCESS")
+
+    def run(self):
+        """
+        执行整理任务
 
-            # 执行移动或预演
+        Returns:
+            移动的项目数（预演模式下为 0）
+        """
+        self.print_log(f"=== 开始整理 ===")
+        self.print_log(f"工作目录: {self.paths['EXE_DIR']}")
+        if self.dry_run: 
+            self.print_log("--- 预演模式 ---")
+
+        try:
+            items_processed = 0
             if self.dry_run:
-                self.print_log(f"[预演] {item_type} '{item}' -> '{category}'")
+                for entry in self.iter_plan():
+                    self.process_entry(None, entry)
             else:
-                # 确保目标目录存在
-                if not os.path.exists(dest_dir): 
-                    os.makedirs(dest_dir)
-                # 获取唯一目标路径
-                dest_path = self.get_unique_path(dest_dir, item)
-                try:
-                    shutil.move(source_path, dest_path)
-                    self.print_log(f"移动: {item} -> {category}")
-                    self.db.log("整理", item_type, item, source_path, dest_path, "SUCCESS")
-                    items_processed += 1
-                except Exception as e:
-                    self.print_log(f"移动失败 {item}: {e}")
-                    self.db.log("整理", item_type, item, source_path, dest_path, f"FAIL: {e}")
-
-        self.print_log(f"整理完成，共处理 {items_processed} 个项目。")
+                with self.create_move_executor() as executor:
+                    for entry in self.iter_plan():
+                        self.process_entry(executor, entry)
+                items_processed = executor.files_moved
+                self.print_log(executor.throughput_message())
+
+            self.print_log(f"整理完成，共处理 {items_processed} 个项目。")
+            self._finish_run(cleanup_logs=True)
+        finally:
+            # 出错时同样关闭 AI 缓存，提交已写入的分类结果并释放数据库连接
+            self._close_cache()
+        return items_processed
+
+    def watch(self, stop_event=None):
+        """
+        监视源目录，新文件写入完成（大小和修改时间在 WATCH_SETTLE_SECONDS 秒内不再变化）后
+        立即经过策略链分类并移动；启动时已存在的项目同样会被处理一次。
+        只监视顶层，按 Ctrl+C 或设置 stop_event 后退出；
+        每隔 WATCH_MAINTENANCE_MINUTES 分钟训练本地模型并清理旧日志（0 表示只在退出时执行）
+        
+        Args:
+            stop_event: threading.Event，设置后停止监视
+        """
+        source_dir = self.paths["EXE_DIR"]
+        settle_seconds = self.config.getfloat('SETTINGS', 'WATCH_SETTLE_SECONDS', fallback=5)
+        poll_interval = self.config.getfloat('SETTINGS', 'WATCH_POLL_INTERVAL', fallback=2)
+        maintenance_interval = self.config.getfloat('SETTINGS', 'WATCH_MAINTENANCE_MINUTES', fallback=30) * 60
+        
+        self.print_log(f"=== 开始监视 ===")
+        self.print_log(f"工作目录: {source_dir}")
+        if self.dry_run: 
+            self.print_log("--- 预演模式 ---")
+        
+        try:
+            scanner = self.create_scanner()
+            watcher = create_watcher(source_dir, poll_interval)
+            tracker = SettleTracker(source_dir, settle_seconds)
+            self.print_log(f"监视方式: {'inotify' if isinstance(watcher, InotifyWatcher) else '轮询'}，"
+                           f"文件 {settle_seconds:g} 秒内不再变化后整理")
+            for name in watcher.existing():
+                tracker.touch(name)
+        
+            items_processed = 0
+            executor = None if self.dry_run else self.create_move_executor()
+            next_maintenance = time.monotonic() + maintenance_interval
+            try:
+                while stop_event is None or not stop_event.is_set():
+                    # 有待稳定的项目时缩短等待，以便及时检查
+                    timeout = min(1.0, settle_seconds) if len(tracker) else poll_interval
+                    for name in watcher.wait(timeout):
+                        tracker.touch(name)
+                    items = [item for item in (scanner.item_for(source_dir, name) for name in tracker.ready()) if item]
+                    for entry in self._plan_chunk(items) if items else ():
+                        self.process_entry(executor, entry)
+                    # 长时间监视时定期维护历史记录，不必等到退出
+                    if maintenance_interval > 0 and time.monotonic() >= next_maintenance:
+                        self._maintain_history()
+                        next_maintenance = time.monotonic() + maintenance_interval
+            except KeyboardInterrupt:
+                pass
+            finally:
+                watcher.close()
+                if executor is not None:
+                    executor.close()
+                    items_processed = executor.files_moved
+                    self.print_log(executor.throughput_message())
+        
+            self.print_log(f"监视结束，共处理 {items_processed} 个项目。")
+            self._finish_run(cleanup_logs=True)
+        finally:
+            # 出错时同样关闭 AI 缓存，提交已写入的分类结果并释放数据库连接
+            self._close_cache()
+
+    def write_plan(self, out_path) -> int:
+        """
+        只扫描和分类，不移动文件，将整理计划流式写入 JSONL 文件
+        
+        Args:
+            out_path: 计划文件路径
+            
+        Returns:
+            计划条目数
+        """
+        self.print_log(f"=== 生成整理计划 ===")
+        self.print_log(f"工作目录: {self.paths['EXE_DIR']}")
+        try:
+            with PlanWriter(out_path) as writer:
+                for entry in self.iter_plan():
+                    self.print_log(f"[计划] {entry.item_type} '{entry.name}' -> '{entry.category}' ({entry.strategy})")
+                    writer.write(entry)
+            self.print_log(f"计划已保存至 {out_path}，共 {writer.count} 个项目。")
+            self._finish_run(cleanup_logs=False)
+        finally:
+            # 出错时同样关闭 AI 缓存，提交已写入的分类结果并释放数据库连接
+            self._close_cache()
+        return writer.count
+
+    def apply_plan(self, plan_path) -> int:
+        """
+        按计划文件执行移动，不重新分类、不调用 AI；
+        生成计划后被修改或已不存在的源文件将被跳过
+        
+        Args:
+            plan_path: 计划文件路径
+            
+        Returns:
+            成功移动的项目数
+        """
+        self.print_log(f"=== 执行整理计划 ===")
+        self.print_log(f"计划文件: {plan_path}")
+        try:
+            items_processed = 0
+            items_skipped = 0
+            with self.create_move_executor() as executor:
+                for entry in read_plan(plan_path):
+                    if entry.source_changed():
+                        self.print_log(f"跳过: {entry.name} (生成计划后已变化或不存在)")
+                        items_skipped += 1
+                        continue
+                    if self.dry_run:
+                        self.print_log(f"[预演] {entry.item_type} '{entry.name}' -> '{entry.category}'")
+                    else:
+                        self.submit_entry(executor, entry)
+            if not self.dry_run:
+                items_processed = executor.files_moved
+                self.print_log(executor.throughput_message())
+
+            self.print_log(f"计划执行完成，共处理 {items_processed} 个项目，跳过 {items_skipped} 个。")
+            self._finish_run(cleanup_logs=True)
+        finally:
+            # 出错时同样关闭 AI 缓存，提交已写入的分类结果并释放数据库连接
+            self._close_cache()
+        return items_processed
+
+    def _close_cache(self):
+        """关闭 AI 缓存（可重复调用）"""
+        if self.ai_cache is not None:
+            self.ai_cache.close()
+            self.ai_cache = None
+
+    def _finish_run(self, cleanup_logs):
+        """输出统计并释放本次运行的资源"""
+        if self.deduper is not None:
+            self.print_log(self.deduper.stats_message())
+        
+        if self.ai_cache is not None:
+            self.print_log(self.ai_cache.stats_message())
+        self._close_cache()
+        
+        circuit = self.ai_client.circuit_stats()
+        if circuit['trip_count'] or circuit['skipped_calls']:
+            self.print_log(f"AI 熔断: 当前状态 {circuit['state']}，累计熔断 {circuit['trip_count']} 次，"
+                           f"跳过 {circuit['skipped_calls']} 次请求，约节省 {circuit['time_saved']} 秒等待")
+        
+        if cleanup_logs:
+            self._maintain_history()
+
+    def _maintain_history(self):
+        """用新的整理记录增量训练本地模型，之后清理超出保留数量的旧日志"""
+        # 训练需在清理旧日志之前
+        if self.learned_classifier is not None:
+            learned = self.learned_classifier.update_from_history(self.db)
+            if learned:
+                self.print_log(f"本地分类模型已更新，新增 {learned} 条样本。")
         
         # 自动清理旧日志
         retention_count = self.config.getint('SETTINGS', 'LOG_RETENTION_COUNT', fallback=100)
-        self.db.cleanup_old_logs(retention_count)
+        self.db.cleanup_old_logs(
+            retention_count, archive=self.config.getboolean('SETTINGS', 'LOG_ARCHIVE', fallback=True)
+        )
@@ -0,0 +1,81 @@
+"""
+Plan - 整理计划的序列化
+预演时生成 JSONL 计划文件（每行一个条目，流式写入），之后可直接按计划执行而无需重新分类
+"""
+import os
+import json
+from dataclasses import dataclass, asdict
+from typing import Iterator, Optional
+
+
+@dataclass
+class PlanEntry:
+    """整理计划中的单个条目"""
+
+    source: str                 # 源路径
+    category: str               # 分类名称
+    dest_dir: str               # 目标目录
+    dest: str                   # 计划的目标路径（执行时如有重名会重新分配）
+    strategy: str               # 给出分类结果的策略名称
+    is_dir: bool                # 是否为文件夹
+    size: Optional[int] = None  # 生成计划时源文件的大小（文件夹为 None）
+    mtime_ns: Optional[int] = None  # 生成计划时源文件的修改时间
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.source)
+
+    @property
+    def item_type(self) -> str:
+        return "文件夹" if self.is_dir else "文件"
+
+    @staticmethod
+    def stat_signature(path: str, is_dir: bool):
+        """读取源路径的状态签名 (size, mtime_ns)，文件夹不比较大小"""
+        st = os.stat(path)
+        return (None if is_dir else st.st_size), st.st_mtime_ns
+
+    def source_changed(self) -> bool:
+        """源路径在生成计划后是否被修改、替换或删除"""
+        try:
+            return self.stat_signature(self.source, self.is_dir) != (self.size, self.mtime_ns)
+        except OSError:
+            return True
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line: str) -> "PlanEntry":
+        return cls(**json.loads(line))
+
+
+class PlanWriter:
+    """流式写入计划文件，避免在内存中保留完整计划"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, entry: PlanEntry):
+        self._file.write(entry.to_json() + "\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_plan(path: str) -> Iterator[PlanEntry]:
+    """逐行读取计划文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield PlanEntry.from_json(line)
@@ -1,6 +1,9 @@
 import os
-import shutil
 import logging
+from .mover import create_move_executor
+from .move_engine import is_partial
+from .name_index import DestinationNameIndex
+from .db_manager import format_time, parse_time
 
 class Restorer:
     def __init__(self, paths, config, rules, db, log_callback=None):
@@ -9,28 +12,133 @@ class Restorer:
         self.rules = rules
         self.db = db
         self.log_callback = log_callback
+        self.name_index = DestinationNameIndex()
 
     def print_log(self, message):
         if self.log_callback:
             self.log_callback(message)
 
     def get_unique_path(self, dest_dir, filename, suffix=""):
-        base, ext = os.path.splitext(filename)
-        counter = 1
-        new_filename = filename
-        dest_path = os.path.join(dest_dir, new_filename)
-        while os.path.exists(dest_path):
-            insert_str = f"_{suffix}{counter}" if suffix else f"_{counter}"
-            new_filename = f"{base}{insert_str}{ext}"
-            dest_path = os.path.join(dest_dir, new_filename)
-            counter += 1
-        return dest_path
+        return self.name_index.reserve(dest_dir, filename, suffix)
+
+    def submit_restore(self, executor, entry, exe_dir):
+        """提交单个项目的还原移动，完成后写入历史记录"""
+        item = entry.name
+        src_path = entry.path
+        is_dir = entry.is_dir()
+        item_type = "文件夹" if is_dir else "文件"
+        try:
+            size = None if is_dir else entry.stat().st_size
+        except OSError:
+            size = None
+        dest_path = executor.reserve(exe_dir, item, "还原")
+
+        def on_done(error):
+            if error is None:
+                self.print_log(f"还原: {item}")
+                self.db.log("还原", item_type, item, src_path, dest_path, "SUCCESS")
+            else:
+                self.print_log(f"还原失败 {item}: {error}")
+                self.db.log("还原", item_type, item, src_path, dest_path, f"FAIL: {error}")
+
+        executor.submit(src_path, dest_path, size, on_done)
+
+    def run_journal(self, run_id=None, since=None, until=None):
+        """
+        按历史记录还原：只读取指定运行或时间范围内的移动记录，按与整理相反的顺序把 dest_path 移回 source_path，
+        不扫描分类文件夹，也不会动整理之前就在归档中的文件。
+        目标已不存在、原位置已被占用或整理后被修改过的项目会被跳过
+
+        Args:
+            run_id: 只还原该运行（运行编号见整理日志或 runs 表），None 表示不限
+            since: 起始时间（含），None 表示不限
+            until: 结束时间（含），None 表示不限
+
+        Returns:
+            还原的项目数量
+        """
+        since, until = parse_time(since), parse_time(until, end=True)
+        if run_id is not None:
+            scope = f"运行 #{run_id}"
+        else:
+            scope = f"{format_time(since) or '最早'} ~ {format_time(until) or '现在'}"
+        self.print_log(f"=== 开始按历史记录还原 ({scope}) ===")
+        claimed = set()  # 本次已提交的源路径与目标路径（同一路径在历史中可能出现多次）
+        parents = set()
+        skipped = 0
+
+        with create_move_executor(self.config, self.name_index) as executor:
+            for _, ts, item_type, filename, src_path, dest_path in self.db.iter_journal(run_id, since, until):
+                reason = self._journal_skip_reason(ts, src_path, dest_path, claimed)
+                if reason:
+                    skipped += 1
+                    self.print_log(f"跳过还原 {filename}: {reason}")
+                    continue
+                claimed.add(os.path.normcase(src_path))
+                claimed.add(os.path.normcase(dest_path))
+                parents.add(os.path.dirname(dest_path))
+                self.submit_journal_restore(executor, item_type, filename, src_path, dest_path)
+        items_restored = executor.files_moved
+        self.print_log(executor.throughput_message())
+
+        # 删除还原后变空的分类文件夹（及归档文件夹）
+        for folder_path in sorted(parents, key=len, reverse=True):
+            for path in (folder_path, os.path.dirname(folder_path)):
+                try:
+                    if path != self.paths["EXE_DIR"] and not os.listdir(path):
+                        os.rmdir(path)
+                except OSError:
+                    pass
+
+        self.print_log(f"还原完成，共还原 {items_restored} 个项目，跳过 {skipped} 个。")
+        return items_restored
+
+    @staticmethod
+    def _journal_skip_reason(ts, src_path, dest_path, claimed):
+        """检查一条移动记录能否还原，可以还原时返回 None"""
+        if os.path.normcase(dest_path) in claimed:
+            return "已由更新的记录还原"
+        try:
+            st = os.lstat(dest_path)
+        except OSError:
+            return "整理后的文件已不存在"
+        if os.path.normcase(src_path) in claimed or os.path.lexists(src_path):
+            return "原位置已被占用"
+        # 记录时间只精确到秒，留出 1 秒余量
+        if ts is not None and st.st_mtime > ts + 1:
+            return "整理后已被修改"
+        return None
+
+    def submit_journal_restore(self, executor, item_type, filename, src_path, dest_path):
+        """提交一条历史记录的还原移动（移回记录中的原路径），完成后写入历史记录"""
+        src_dir = os.path.dirname(src_path)
+        if not os.path.exists(src_dir):
+            os.makedirs(src_dir)
+        size = None
+        if item_type != "文件夹":
+            try:
+                size = os.path.getsize(dest_path)
+            except OSError:
+                pass
+
+        def on_done(error):
+            if error is None:
+                self.print_log(f"还原: {filename}")
+                self.db.log("还原", item_type, filename, dest_path, src_path, "SUCCESS")
+            else:
+                self.print_log(f"还原失败 {filename}: {error}")
+                self.db.log("还原", item_type, filename, dest_path, src_path, f"FAIL: {error}")
+
+        executor.submit(dest_path, src_path, size, on_done)
 
     def run(self):
         self.print_log(f"=== 开始还原 ===")
         exe_dir = self.paths["EXE_DIR"]
         target_name = self.config.get('SETTINGS', 'TARGET_NAME', fallback='归档文件夹')
         folders_to_check = []
+        # 分类文件夹以及重复文件检测使用的文件夹
+        categories = list(self.rules.keys())
+        categories.append(self.config.get('SETTINGS', 'DEDUPE_CATEGORY', fallback='22_重复文件').strip())
 
         if target_name != 'NONE':
             target_path = os.path.join(exe_dir, target_name)
@@ -39,35 +147,33 @@ class Restorer:
                     path = os.path.join(target_path, item)
                     if os.path.isdir(path): folders_to_check.append(path)
             else:
-                for category in self.rules.keys():
+                for category in categories:
                     cat_path = os.path.join(exe_dir, category)
                     if os.path.exists(cat_path): folders_to_check.append(cat_path)
         else:
-            for category in self.rules.keys():
+            for category in categories:
                 cat_path = os.path.join(exe_dir, category)
                 if os.path.exists(cat_path): folders_to_check.append(cat_path)
 
         if not folders_to_check:
             self.print_log("未发现需要还原的文件夹。")
-            return
+            return 0
 
-        items_restored = 0
-        for folder_path in folders_to_check:
-            self.print_log(f"正在扫描: {os.path.basename(folder_path)}")
-            for item in os.listdir(folder_path):
-                src_path = os.path.join(folder_path, item)
-                is_dir = os.path.isdir(src_path)
-                item_type = "文件夹" if is_dir else "文件"
-                dest_path = self.get_unique_path(exe_dir, item, "还原")
-                try:
-                    shutil.move(src_path, dest_path)
-                    self.print_log(f"还原: {item}")
-                    self.db.log("还原", item_type, item, src_path, dest_path, "SUCCESS")
-                    items_restored += 1
-                except Exception as e:
-                    self.print_log(f"还原失败 {item}: {e}")
-                    self.db.log("还原", item_type, item, src_path, dest_path, f"FAIL: {e}")
+        # 目标名称在扫描线程中按顺序预留，移动交给并行执行器
+        with create_move_executor(self.config, self.name_index) as executor:
+            for folder_path in folders_to_check:
+                self.print_log(f"正在扫描: {os.path.basename(folder_path)}")
+                with os.scandir(folder_path) as entries:
+                    for entry in entries:
+                        # 跳过跨设备复制中断留下的临时文件
+                        if is_partial(entry.name):
+                            continue
+                        self.submit_restore(executor, entry, exe_dir)
+        items_restored = executor.files_moved
+        self.print_log(executor.throughput_message())
 
+        # 所有移动完成后再删除空的分类文件夹
+        for folder_path in folders_to_check:
             try:
                 if not os.listdir(folder_path):
                     os.rmdir(folder_path)
@@ -83,4 +189,7 @@ class Restorer:
         
         # 自动清理旧日志
         retention_count = self.config.getint('SETTINGS', 'LOG_RETENTION_COUNT', fallback=100)
-        self.db.cleanup_old_logs(retention_count)
+        self.db.cleanup_old_logs(
+            retention_count, archive=self.config.getboolean('SETTINGS', 'LOG_ARCHIVE', fallback=True)
+        )
+        return items_restored
@@ -0,0 +1,129 @@
+"""
+RuleIndex - 分类规则编译索引
+在每次整理开始时将 rules 编译为哈希表，避免对每个文件线性扫描所有分类
+"""
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class RuleIndex:
+    """
+    分类规则的只读快照
+
+    规则字典的遍历顺序即分类优先级：同一扩展名出现在多个分类中时，
+    以排在最前的分类为准（与原先的逐项扫描保持一致）。
+    """
+
+    def __init__(self, rules: Dict[str, List[str]]):
+        """
+        编译规则
+
+        Args:
+            rules: 分类规则字典 {分类名: [扩展名/关键词, ...]}
+        """
+        self.categories = list(rules.keys())
+        self.ext_map: Dict[str, str] = {}
+        for category, patterns in rules.items():
+            for pattern in patterns:
+                self.ext_map.setdefault(pattern, category)
+        self.keyword_matcher = KeywordMatcher(rules)
+
+    def match_extension(self, ext: str) -> Optional[str]:
+        """
+        按扩展名查找分类
+
+        Args:
+            ext: 小写扩展名（含点号），如 ".zip"
+
+        Returns:
+            分类名称，未命中返回 None
+        """
+        return self.ext_map.get(ext)
+
+    def match_keyword(self, filename: str) -> Optional[str]:
+        """
+        按文件名中的关键词查找分类
+
+        Args:
+            filename: 文件名
+
+        Returns:
+            分类名称，未命中返回 None
+        """
+        return self.keyword_matcher.match(filename)
+
+
+class KeywordMatcher:
+    """
+    基于 Aho-Corasick 自动机的多关键词匹配器
+
+    构建时将所有非扩展名关键词（不以 "." 开头）小写后插入同一个自动机，
+    每个节点记录经失配链可达的最小分类序号。匹配时只需对文件名做一次线性扫描，
+    耗时与关键词总数无关；命中多个分类时返回在 rules 中排在最前的分类。
+    """
+
+    def __init__(self, rules: Dict[str, List[str]]):
+        self.categories = list(rules.keys())
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._rank: List[int] = [-1]
+        for rank, patterns in enumerate(rules.values()):
+            for pattern in patterns:
+                if pattern and not pattern.startswith('.'):
+                    self._insert(pattern.lower(), rank)
+        self._build_fail_links()
+
+    def _insert(self, keyword: str, rank: int):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._rank.append(-1)
+            node = nxt
+        if self._rank[node] < 0 or rank < self._rank[node]:
+            self._rank[node] = rank
+
+    def _build_fail_links(self):
+        goto, fail, ranks = self._goto, self._fail, self._rank
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fallback = goto[f].get(ch, 0)
+                fail[child] = fallback if fallback != child else 0
+                # 合并失配链上的输出：只保留优先级最高（序号最小）的分类
+                inherited = ranks[fail[child]]
+                if inherited >= 0 and (ranks[child] < 0 or inherited < ranks[child]):
+                    ranks[child] = inherited
+                queue.append(child)
+
+    def match(self, filename: str) -> Optional[str]:
+        """
+        单次扫描文件名，返回优先级最高的命中分类
+
+        Args:
+            filename: 文件名（大小写不敏感）
+
+        Returns:
+            分类名称，未命中返回 None
+        """
+        goto, fail, ranks = self._goto, self._fail, self._rank
+        best = -1
+        node = 0
+        for ch in filename.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            rank = ranks[node]
+            if rank >= 0 and (best < 0 or rank < best):
+                best = rank
+                if best == 0:
+                    break
+        return self.categories[best] if best >= 0 else None
@@ -0,0 +1,159 @@
+"""
+Scanner - 基于 os.scandir 的目录扫描
+复用 DirEntry 自带的类型信息与 stat 结果，排除检查使用预先计算好的集合，
+避免逐项 abspath / isdir / stat 带来的额外系统调用（在网络共享上每次都是一次往返）
+"""
+import os
+import re
+import fnmatch
+from typing import Iterable, Iterator, List, Optional
+from .move_engine import is_partial
+
+
+class ScanItem:
+    """待整理的文件/文件夹（可由 DirEntry 构造，并缓存其 stat 结果）"""
+
+    __slots__ = ("name", "path", "is_dir", "deferred", "_entry", "_stat")
+
+    def __init__(self, name: str, path: str, is_dir: bool, entry: Optional[os.DirEntry] = None):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.deferred = False  # AI 熔断期间推迟到下次运行处理
+        self._entry = entry
+        self._stat = None
+
+    @classmethod
+    def from_entry(cls, entry: os.DirEntry) -> "ScanItem":
+        # 与 os.path.isdir 一致跟随符号链接；多数平台上类型信息来自目录项本身，不需要额外 stat
+        return cls(entry.name, entry.path, entry.is_dir(), entry)
+
+    def stat(self) -> os.stat_result:
+        """返回（缓存的）stat 结果，优先复用 DirEntry 的缓存"""
+        if self._stat is None:
+            self._stat = self._entry.stat() if self._entry is not None else os.stat(self.path)
+        return self._stat
+
+    def stat_signature(self):
+        """状态签名 (size, mtime_ns)，与 PlanEntry.stat_signature 相同，文件夹不比较大小"""
+        st = self.stat()
+        return (None if self.is_dir else st.st_size), st.st_mtime_ns
+
+
+def compile_globs(patterns: Iterable[str]) -> List["re.Pattern"]:
+    """预编译通配符（大小写规则与 fnmatch 相同：Windows 不区分大小写）"""
+    return [re.compile(fnmatch.translate(os.path.normcase(p))) for p in patterns if p]
+
+
+def _match_any(globs, name: str, rel_path: str) -> bool:
+    """通配符可匹配名称，也可匹配相对路径（以 / 分隔）"""
+    name = os.path.normcase(name)
+    rel_path = os.path.normcase(rel_path)
+    return any(g.match(name) or g.match(rel_path) for g in globs)
+
+
+class DirectoryScanner:
+    """扫描目录，跳过排除路径与保留名称（归档文件夹、分类文件夹等）"""
+
+    def __init__(self, exclude_paths: Iterable[str] = (), reserved_names: Iterable[str] = (),
+                 include: Iterable[str] = (), exclude: Iterable[str] = ()):
+        """
+        Args:
+            exclude_paths: 需要跳过的完整路径（程序文件、配置、数据库、归档文件夹等），递归时整棵子树被剪除
+            reserved_names: 顶层需要跳过的目录项名称
+            include: 只保留名称或相对路径匹配这些通配符的项目（为空表示全部）
+            exclude: 跳过名称或相对路径匹配这些通配符的项目，递归时匹配的文件夹整棵剪除
+        """
+        self.exclude_paths = frozenset(os.path.normcase(os.path.abspath(p)) for p in exclude_paths)
+        self.reserved_names = frozenset(reserved_names)
+        self.include = compile_globs(include)
+        self.exclude = compile_globs(exclude)
+
+    def is_excluded(self, name: str, path: str) -> bool:
+        """path 需为绝对路径；移动引擎未完成的临时文件始终跳过"""
+        return name in self.reserved_names or os.path.normcase(path) in self.exclude_paths or is_partial(name)
+
+    def item_for(self, directory: str, name: str) -> Optional[ScanItem]:
+        """
+        为目录中的单个名称构造 ScanItem（监视模式使用），被排除、不匹配通配符或已不存在时返回 None
+        """
+        path = os.path.join(os.path.abspath(directory), name)
+        if self.is_excluded(name, path):
+            return None
+        if self.exclude and _match_any(self.exclude, name, name):
+            return None
+        if self.include and not _match_any(self.include, name, name):
+            return None
+        if not os.path.lexists(path):
+            return None
+        return ScanItem(name, path, os.path.isdir(path))
+
+    def scan(self, directory: str) -> Iterator[ScanItem]:
+        """
+        按目录顺序逐个返回未被排除的项目
+
+        Args:
+            directory: 要扫描的目录
+
+        Yields:
+            ScanItem（path 为绝对路径）
+        """
+        # 先把目录转为绝对路径，DirEntry.path 随之为绝对路径，无需逐项 abspath
+        with os.scandir(os.path.abspath(directory)) as entries:
+            for entry in entries:
+                if self.is_excluded(entry.name, entry.path):
+                    continue
+                if self.exclude and _match_any(self.exclude, entry.name, entry.name):
+                    continue
+                if self.include and not _match_any(self.include, entry.name, entry.name):
+                    continue
+                yield ScanItem.from_entry(entry)
+
+    def walk(self, directory: str, max_depth: int = 0) -> Iterator[ScanItem]:
+        """
+        惰性递归遍历：用目录迭代器栈做深度优先遍历，任意时刻只持有当前路径上各层的 scandir 迭代器，
+        内存占用与树的深度相关，与文件总数无关
+
+        文件夹本身不作为项目返回，而是继续深入；达到最大深度的文件夹作为整体返回。
+        指向文件夹的符号链接不跟随，作为整体返回
+
+        Args:
+            directory: 根目录
+            max_depth: 最大深度，顶层为 1，0 表示不限
+
+        Yields:
+            ScanItem（path 为绝对路径）
+        """
+        root = os.path.abspath(directory)
+        stack = [(os.scandir(root), "", 1)]
+        try:
+            while stack:
+                entries, rel_dir, depth = stack[-1]
+                entry = next(entries, None)
+                if entry is None:
+                    entries.close()
+                    stack.pop()
+                    continue
+                if depth == 1 and self.is_excluded(entry.name, entry.path):
+                    continue
+                if depth > 1 and (os.path.normcase(entry.path) in self.exclude_paths or is_partial(entry.name)):
+                    continue
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if self.exclude and _match_any(self.exclude, entry.name, rel_path):
+                    continue
+                try:
+                    descend = entry.is_dir(follow_symlinks=False) and (max_depth <= 0 or depth < max_depth)
+                except OSError:
+                    descend = False
+                if descend:
+                    try:
+                        stack.append((os.scandir(entry.path), rel_path, depth + 1))
+                    except OSError:
+                        continue
+                    continue
+                if self.include and not _match_any(self.include, entry.name, rel_path):
+                    continue
+                yield ScanItem.from_entry(entry)
+        finally:
+            for entries, _, _ in stack:
+                entries.close()
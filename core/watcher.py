@@ -0,0 +1,218 @@
+"""
+Watcher - 监视源目录中新出现的文件
+Linux 上通过 ctypes 调用 inotify，其他平台退化为定时 scandir 比对；
+SettleTracker 负责去抖：文件大小和修改时间（文件夹为其中所有文件）在一段时间内不再变化才认为写入完成
+"""
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from .move_engine import is_partial
+
+# 下载/写入中的临时文件后缀：完成后通常会被重命名，届时再处理
+TEMP_SUFFIXES = (".part", ".crdownload", ".tmp", ".download", ".partial", ".opdownload", ".!qb", ".!ut")
+
+# inotify 事件掩码
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_temporary(name: str) -> bool:
+    """是否为仍在写入中的临时文件"""
+    lower = name.lower()
+    return lower.endswith(TEMP_SUFFIXES) or is_partial(name)
+
+
+class PollingWatcher:
+    """定时 scandir 比对 (大小, 修改时间)，报告新增或变化的名称"""
+
+    def __init__(self, directory: str, interval: float = 2.0):
+        self.directory = directory
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[entry.name] = (st.st_size, st.st_mtime_ns)
+        except OSError as e:
+            logging.error(f"扫描监视目录失败: {e}")
+        return snapshot
+
+    def existing(self) -> List[str]:
+        """启动时已存在的名称"""
+        return list(self._snapshot)
+
+    def wait(self, timeout: float) -> Set[str]:
+        """等待至多 timeout 秒，返回期间新增或变化的名称"""
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {name for name, sig in snapshot.items() if self._snapshot.get(name) != sig}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """基于 inotify 的监视（仅 Linux），只在有事件时唤醒"""
+
+    MASK = IN_CREATE | IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF
+
+    def __init__(self, directory: str):
+        import ctypes
+        import ctypes.util
+        self.directory = directory
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, "inotify_add_watch 失败", directory)
+        self.overflowed = False
+
+    def existing(self) -> List[str]:
+        try:
+            return os.listdir(self.directory)
+        except OSError:
+            return []
+
+    def wait(self, timeout: float) -> Set[str]:
+        """等待至多 timeout 秒，返回期间有写入、创建或移入事件的名称"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        names = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # 事件队列溢出：把当前目录中的所有名称视为有变化
+                    self.overflowed = True
+                    names.update(self.existing())
+                elif mask & (IN_DELETE_SELF | IN_IGNORED):
+                    raise OSError(errno.ENOENT, "监视目录已被删除", self.directory)
+                elif name:
+                    names.add(name)
+        return names
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(directory: str, poll_interval: float = 2.0):
+    """Linux 上优先使用 inotify，不可用时使用轮询"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            logging.warning(f"inotify 不可用，改用轮询监视: {e}")
+    return PollingWatcher(directory, poll_interval)
+
+
+class SettleTracker:
+    """去抖：记录候选项目的 (大小, 修改时间)，连续 settle_seconds 秒不变后才交给整理"""
+
+    def __init__(self, directory: str, settle_seconds: float = 5.0):
+        self.directory = directory
+        self.settle_seconds = settle_seconds
+        self._pending: Dict[str, Tuple[Optional[tuple], float]] = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _signature(self, path: str) -> Optional[tuple]:
+        """文件为 (大小, 修改时间)；文件夹为递归统计的 (总大小, 最新修改时间, 条目数, 是否含临时文件)"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if os.path.isdir(path):
+            # inotify 只监视顶层，子文件夹中的文件增长不会改变文件夹本身的修改时间，需要逐层统计
+            try:
+                return self._tree_signature(path, st)
+            except OSError:
+                return None
+        return (st.st_size, st.st_mtime_ns)
+
+    @staticmethod
+    def _tree_signature(path: str, st: os.stat_result) -> tuple:
+        total_size, latest_mtime, count, writing = 0, st.st_mtime_ns, 0, False
+        stack = [path]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    count += 1
+                    writing = writing or is_temporary(entry.name)
+                    try:
+                        entry_st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    latest_mtime = max(latest_mtime, entry_st.st_mtime_ns)
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        total_size += entry_st.st_size
+        return (total_size, latest_mtime, count, writing)
+
+    @staticmethod
+    def _writing(signature: tuple) -> bool:
+        """文件夹中还有下载中的临时文件（如 .!qb、.part）"""
+        return len(signature) > 2 and signature[3]
+
+    def touch(self, name: str):
+        """记录（或刷新）一个候选名称；临时下载文件直接忽略"""
+        if is_temporary(name):
+            return
+        self._pending[name] = (self._signature(os.path.join(self.directory, name)), time.monotonic())
+
+    def ready(self) -> List[str]:
+        """返回已稳定的名称（并从候选中移除），已消失的名称直接丢弃"""
+        now = time.monotonic()
+        settled = []
+        for name, (signature, since) in list(self._pending.items()):
+            current = self._signature(os.path.join(self.directory, name))
+            if current is None:
+                del self._pending[name]
+            elif current != signature or self._writing(current):
+                self._pending[name] = (current, now)
+            elif now - since >= self.settle_seconds:
+                del self._pending[name]
+                settled.append(name)
+        return settled
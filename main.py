@@ -7,8 +7,6 @@ AIOrganizerAssistant - AI文件整理助手
 import os
 import sys
 import argparse
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
 from datetime import datetime
 from typing import Optional
 
@@ -58,8 +56,8 @@ try:
         
         return None
     
-except ImportError:
-    # 非 Windows 平台的兼容处理
+except (ImportError, AttributeError):
+    # 非 Windows 平台的兼容处理（ctypes.windll 不存在）
     def attach_console():
         """非 Windows 平台无需特殊处理"""
         pass
@@ -75,9 +73,8 @@ except ImportError:
             return icon_path
         return None
 
-# 导入自定义模块
+# 导入自定义模块（GUI 相关模块在 run_gui 中按需导入，保证 CLI 启动速度）
 from core.app_core import AppCore
-from ui.components import SettingsPanel
 
 # ==================== 用户配置区域 ====================
 # API 设置
@@ -95,123 +92,6 @@ WINDOW_SIZE = "750x650"
 # ======================================================
 
 
-class App:
-    """GUI 应用程序"""
-    
-    def __init__(self, root):
-        self.root = root
-        self.root.title(WINDOW_TITLE)
-        self.root.geometry(WINDOW_SIZE)
-        
-        # 初始化 AppCore
-        self.core = AppCore(log_callback=self.log)
-        
-        # 设置窗口图标
-        try:
-            icon_path = get_icon_path()
-            if icon_path:
-                self.root.iconbitmap(icon_path)
-        except Exception as e:
-            print(f"无法加载图标: {e}")
-
-        self.create_widgets()
-        
-        # 窗口关闭时清理资源
-        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
-        
-    def create_widgets(self):
-        self.notebook = ttk.Notebook(self.root)
-        self.notebook.pack(fill="both", expand=True, padx=5, pady=5)
-
-        # --- 标签页 1: 整理控制 ---
-        self.tab_control = ttk.Frame(self.notebook)
-        self.notebook.add(self.tab_control, text="整理控制")
-
-        # 1. 配置区域
-        frame_config = ttk.LabelFrame(self.tab_control, text="快捷设置", padding=10)
-        frame_config.pack(fill="x", padx=10, pady=5)
-        
-        self.var_dry_run = tk.BooleanVar()
-        dry_run = DEFAULT_DRY_RUN or self.core.cm.config.getboolean('SETTINGS', 'DRY_RUN', fallback=False)
-        self.var_dry_run.set(dry_run)
-            
-        ttk.Checkbutton(frame_config, text="预演模式 (只打印不移动)", variable=self.var_dry_run).grid(row=0, column=0, sticky="w", pady=5)
-
-        # 2. 操作区域
-        frame_action = ttk.Frame(self.tab_control, padding=10)
-        frame_action.pack(fill="x", padx=10)
-        
-        self.btn_organize = ttk.Button(frame_action, text="开始整理", command=self.start_organize)
-        self.btn_organize.pack(side="left", fill="x", expand=True, padx=5)
-        
-        self.btn_restore = ttk.Button(frame_action, text="一键还原", command=self.start_restore)
-        self.btn_restore.pack(side="left", fill="x", expand=True, padx=5)
-        
-        self.btn_export = ttk.Button(frame_action, text="导出日志", command=self.export_log)
-        self.btn_export.pack(side="left", fill="x", expand=True, padx=5)
-
-        # 3. 日志区域
-        frame_log = ttk.LabelFrame(self.tab_control, text="运行日志", padding=10)
-        frame_log.pack(fill="both", expand=True, padx=10, pady=5)
-        
-        self.text_log = scrolledtext.ScrolledText(frame_log, height=20, state='disabled')
-        self.text_log.pack(fill="both", expand=True)
-
-        # --- 标签页 2: 高级设置 ---
-        self.tab_settings = SettingsPanel(self.notebook, self.core.cm)
-        self.notebook.add(self.tab_settings, text="高级设置")
-
-    def log(self, message):
-        """GUI 日志回调"""
-        self.text_log.config(state='normal')
-        time_str = datetime.now().strftime('%H:%M:%S')
-        self.text_log.insert(tk.END, f"[{time_str}] {message}\n")
-        self.text_log.see(tk.END)
-        self.text_log.config(state='disabled')
-
-    def toggle_buttons(self, state):
-        for btn in [self.btn_organize, self.btn_restore, self.btn_export]:
-            btn.config(state=state)
-
-    def start_organize(self):
-        dry_run = self.var_dry_run.get()
-        self.toggle_buttons("disabled")
-        self.log("正在启动整理任务...")
-        
-        def task():
-            result = self.core.run_organize(dry_run=dry_run)
-            self.root.after(0, lambda: self.toggle_buttons("normal"))
-            if not result['success']:
-                self.log(f"错误: {result['message']}")
-                
-        import threading
-        threading.Thread(target=task, daemon=True).start()
-
-    def start_restore(self):
-        self.toggle_buttons("disabled")
-        self.log("正在启动还原任务...")
-        def task():
-            result = self.core.run_restore()
-            self.root.after(0, lambda: self.toggle_buttons("normal"))
-            if not result['success']:
-                self.log(f"错误: {result['message']}")
-                
-        import threading
-        threading.Thread(target=task, daemon=True).start()
-
-    def export_log(self):
-        path = self.core.export_log()
-        if path:
-            messagebox.showinfo("导出成功", f"日志已导出至:\n{path}")
-        else:
-            messagebox.showerror("导出失败", "导出日志时发生错误")
-
-    def on_close(self):
-        """窗口关闭时的清理"""
-        self.core.close()
-        self.root.destroy()
-
-
 def run_cli():
     """命令行模式"""
     # 尝试挂载到父进程的控制台（仅 Windows）
@@ -224,15 +104,22 @@ def run_cli():
 示例:
   %(prog)s --action organize              # 执行整理
   %(prog)s --action organize --dry-run    # 预演模式整理
+  %(prog)s --action organize --recursive --max-depth 3 --exclude "*.tmp"  # 递归整理子目录中的文件
+  %(prog)s --action watch                 # 持续监视并整理新文件（Ctrl+C 退出）
   %(prog)s --action restore               # 执行还原
+  %(prog)s --action restore --run-id 42   # 只撤销编号为 42 的那次整理
+  %(prog)s --action restore --since "2026-01-05 14:00" --until "2026-01-05 15:00"  # 只撤销该时间段内的整理
+  %(prog)s --action plan --out plan.jsonl # 生成整理计划（只分类不移动）
+  %(prog)s --action apply --plan plan.jsonl  # 按计划执行整理（不再调用 AI）
+  %(prog)s --action export --format jsonl.gz --incremental  # 只导出上次导出之后的新记录
   %(prog)s --action organize --api-key YOUR_KEY  # 指定API密钥
         """
     )
     
     parser.add_argument(
         '--action',
-        choices=['organize', 'restore'],
-        help='要执行的操作: organize(整理) 或 restore(还原)'
+        choices=['organize', 'restore', 'plan', 'apply', 'watch', 'export'],
+        help='要执行的操作: organize(整理)、restore(还原)、plan(生成整理计划)、apply(执行整理计划)、watch(监视并整理新文件) 或 export(导出历史记录)'
     )
     parser.add_argument(
         '--dry-run',
@@ -247,6 +134,69 @@ def run_cli():
         '--source-dir',
         help='指定要整理的源目录（默认为EXE所在目录）'
     )
+    parser.add_argument(
+        '--recursive',
+        action='store_true',
+        default=None,
+        help='递归整理子目录中的文件（默认只整理顶层项目）'
+    )
+    parser.add_argument(
+        '--max-depth',
+        type=int,
+        help='递归的最大深度，顶层为 1，0 表示不限；达到深度的文件夹整体移动'
+    )
+    parser.add_argument(
+        '--include',
+        action='append',
+        metavar='GLOB',
+        help='只整理名称或相对路径匹配通配符的项目（可多次指定）'
+    )
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        metavar='GLOB',
+        help='跳过名称或相对路径匹配通配符的项目，匹配的文件夹不再深入（可多次指定）'
+    )
+    parser.add_argument(
+        '--run-id',
+        type=int,
+        help='restore 操作：按历史记录只撤销指定编号的运行（编号见整理日志中的“运行编号”）；export 操作：只导出该运行的记录'
+    )
+    parser.add_argument(
+        '--since',
+        metavar='TIME',
+        help='restore/export 操作：只处理此时间之后的记录（YYYY-MM-DD [HH:MM[:SS]]）'
+    )
+    parser.add_argument(
+        '--until',
+        metavar='TIME',
+        help='restore/export 操作：只处理此时间之前的记录，只给出日期时包含当天'
+    )
+    parser.add_argument(
+        '--out',
+        help='plan 操作的计划文件输出路径（JSONL）；export 操作的导出文件路径（默认在源目录下按时间命名）'
+    )
+    parser.add_argument(
+        '--format',
+        choices=['csv', 'csv.gz', 'jsonl', 'jsonl.gz'],
+        default='csv',
+        help='export 操作的导出格式（默认 csv）'
+    )
+    parser.add_argument(
+        '--status',
+        choices=['SUCCESS', 'FAIL', 'SKIP'],
+        type=str.upper,
+        help='export 操作：只导出该状态的记录'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='export 操作：只导出上次增量导出之后的新记录'
+    )
+    parser.add_argument(
+        '--plan',
+        help='apply 操作要执行的计划文件路径'
+    )
     
     args = parser.parse_args()
     
@@ -254,6 +204,10 @@ def run_cli():
     if not args.action:
         parser.print_help()
         return
+    if args.action == 'plan' and not args.out:
+        parser.error('plan 操作需要通过 --out 指定计划文件路径')
+    if args.action == 'apply' and not args.plan:
+        parser.error('apply 操作需要通过 --plan 指定计划文件路径')
     
     # CLI 日志回调函数（直接打印到控制台）
     def cli_log(message):
@@ -263,16 +217,57 @@ def run_cli():
     # 初始化 AppCore
     core = AppCore(log_callback=cli_log)
     
+    # 扫描范围（未在命令行指定的使用配置文件中的值）
+    scan_options = {
+        'recursive': args.recursive,
+        'max_depth': args.max_depth,
+        'include': args.include,
+        'exclude': args.exclude
+    }
+    
     try:
         # 根据参数执行对应操作
         if args.action == 'organize':
             result = core.run_organize(
                 api_key=args.api_key,
                 dry_run=args.dry_run,
-                source_dir=args.source_dir
+                source_dir=args.source_dir,
+                **scan_options
+            )
+        elif args.action == 'watch':
+            result = core.run_watch(
+                api_key=args.api_key,
+                dry_run=args.dry_run,
+                source_dir=args.source_dir,
+                include=args.include,
+                exclude=args.exclude
             )
         elif args.action == 'restore':
-            result = core.run_restore(source_dir=args.source_dir)
+            result = core.run_restore(
+                source_dir=args.source_dir,
+                since=args.since,
+                until=args.until,
+                run_id=args.run_id
+            )
+        elif args.action == 'plan':
+            result = core.run_plan(
+                out_path=args.out,
+                api_key=args.api_key,
+                source_dir=args.source_dir,
+                **scan_options
+            )
+        elif args.action == 'apply':
+            result = core.run_apply(plan_path=args.plan, dry_run=args.dry_run)
+        elif args.action == 'export':
+            result = core.run_export(
+                out_path=args.out,
+                fmt=args.format,
+                run_id=args.run_id,
+                since=args.since,
+                until=args.until,
+                status=args.status,
+                incremental=args.incremental
+            )
         else:
             result = {'success': False, 'message': '未知的操作'}
         
@@ -289,8 +284,17 @@ def run_cli():
 
 def run_gui():
     """图形界面模式"""
+    import tkinter as tk
+    from ui.main_window import App
+    
     root = tk.Tk()
-    app = App(root)
+    app = App(
+        root,
+        title=WINDOW_TITLE,
+        size=WINDOW_SIZE,
+        default_dry_run=DEFAULT_DRY_RUN,
+        icon_path=get_icon_path()
+    )
     root.mainloop()
 
 
@@ -0,0 +1,40 @@
+"""
+LearnedClassifier 单元测试
+"""
+import unittest
+
+from core.learned_classifier import NaiveBayesModel
+
+CATEGORIES = ["11_图片照片", "02_文档", "03_压缩文件"]
+
+
+def skewed_model():
+    """95 张图片、5 个文档的历史记录"""
+    model = NaiveBayesModel()
+    prefixes = ["IMG_", "DSC", "Screenshot_", "photo_"]
+    for i in range(95):
+        model.learn(f"{prefixes[i % len(prefixes)]}{1000 + i * 37}.jpg", False, "11_图片照片")
+    for i in range(5):
+        model.learn(f"report_{i}.docx", False, "02_文档")
+    return model
+
+
+class NaiveBayesModelTest(unittest.TestCase):
+    def test_unseen_names_are_not_classified(self):
+        model = skewed_model()
+        for name in ("download", "xyzqwv", "setup.bin", "qqq.zzz"):
+            with self.subTest(name=name):
+                self.assertEqual(model.predict(name, False, CATEGORIES), (None, 0.0))
+
+    def test_known_names_are_classified(self):
+        model = skewed_model()
+        category, confidence = model.predict("IMG_2024.jpg", False, CATEGORIES)
+        self.assertEqual(category, "11_图片照片")
+        self.assertGreaterEqual(confidence, 0.9)
+        category, confidence = model.predict("report_final.docx", False, CATEGORIES)
+        self.assertEqual(category, "02_文档")
+        self.assertGreaterEqual(confidence, 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+move_engine 单元测试
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from core import move_engine
+
+
+class CopyTreeResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.src = os.path.join(self.root, "src", "album")
+        self.dst = os.path.join(self.root, "dst", "album")
+        os.makedirs(os.path.join(self.src, "CD1"))
+        os.makedirs(os.path.dirname(self.dst))
+        self.track = os.path.join(self.src, "CD1", "track01.flac")
+        with open(self.track, "wb") as f:
+            f.write(b"a" * 4096)
+        with open(os.path.join(self.src, "cover.jpg"), "wb") as f:
+            f.write(b"c" * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_resume_after_source_file_changed(self):
+        # 模拟中断：临时文件夹中留有按旧内容签名的半截文件
+        partial = move_engine._partial_path(self.dst, self.src, os.stat(self.src))
+        os.makedirs(os.path.join(partial, "CD1"))
+        stale = move_engine._partial_path(os.path.join(partial, "CD1", "track01.flac"), self.track, os.stat(self.track))
+        with open(stale, "wb") as f:
+            f.write(b"a" * 1024)
+        with open(os.path.join(partial, "removed.txt"), "wb") as f:
+            f.write(b"gone")
+
+        # 中断后源文件被修改
+        with open(self.track, "ab") as f:
+            f.write(b"b" * 1000)
+        os.utime(self.track, ns=(0, os.stat(self.track).st_mtime_ns + 10 ** 9))
+
+        move_engine._copy_tree(self.src, self.dst)
+
+        found = sorted(os.path.relpath(os.path.join(root, name), self.dst)
+                       for root, _, files in os.walk(self.dst) for name in files)
+        self.assertEqual(found, sorted(["cover.jpg", os.path.join("CD1", "track01.flac")]))
+        with open(os.path.join(self.dst, "CD1", "track01.flac"), "rb") as f:
+            self.assertEqual(f.read(), b"a" * 4096 + b"b" * 1000)
+        self.assertFalse(os.path.exists(partial))
+
+
+if __name__ == "__main__":
+    unittest.main()
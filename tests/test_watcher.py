@@ -0,0 +1,43 @@
+"""
+SettleTracker 单元测试
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.watcher import SettleTracker
+
+
+class SettleTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.folder = os.path.join(self.root, "torrent")
+        os.makedirs(os.path.join(self.folder, "CD1"))
+        self.tracker = SettleTracker(self.root, settle_seconds=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_folder_with_partial_file_inside_is_not_ready(self):
+        with open(os.path.join(self.folder, "CD1", "track01.flac.!qb"), "wb") as f:
+            f.write(b"x")
+        self.tracker.touch("torrent")
+        self.assertEqual(self.tracker.ready(), [])
+        os.rename(os.path.join(self.folder, "CD1", "track01.flac.!qb"), os.path.join(self.folder, "CD1", "track01.flac"))
+        self.assertEqual(self.tracker.ready(), [])  # 内容变化后重新计时
+        self.assertEqual(self.tracker.ready(), ["torrent"])
+
+    def test_file_growing_in_subfolder_resets_settle(self):
+        path = os.path.join(self.folder, "CD1", "track01.flac")
+        with open(path, "wb") as f:
+            f.write(b"x")
+        self.tracker.touch("torrent")
+        with open(path, "ab") as f:
+            f.write(b"more")
+        self.assertEqual(self.tracker.ready(), [])
+        self.assertEqual(self.tracker.ready(), ["torrent"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+AIOrganizerAssistant - 主窗口
+仅在 GUI 模式下导入，CLI 模式无需加载 tkinter
+"""
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext
+from datetime import datetime
+
+from core.app_core import AppCore
+from ui.components import SettingsPanel
+
+
+class App:
+    """GUI 应用程序"""
+    
+    def __init__(self, root, title="AI整理助手", size="750x650", default_dry_run=False, icon_path=None):
+        """
+        Args:
+            root: Tk 根窗口
+            title: 窗口标题
+            size: 窗口尺寸，如 "750x650"
+            default_dry_run: 预演模式复选框的默认值（与配置文件 DRY_RUN 取或）
+            icon_path: 窗口图标路径
+        """
+        self.root = root
+        self.root.title(title)
+        self.root.geometry(size)
+        self.default_dry_run = default_dry_run
+        
+        # 初始化 AppCore
+        self.core = AppCore(log_callback=self.log)
+        
+        # 设置窗口图标
+        try:
+            if icon_path:
+                self.root.iconbitmap(icon_path)
+        except Exception as e:
+            print(f"无法加载图标: {e}")
+
+        self.create_widgets()
+        
+        # 窗口关闭时清理资源
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+    def create_widgets(self):
+        self.notebook = ttk.Notebook(self.root)
+        self.notebook.pack(fill="both", expand=True, padx=5, pady=5)
+
+        # --- 标签页 1: 整理控制 ---
+        self.tab_control = ttk.Frame(self.notebook)
+        self.notebook.add(self.tab_control, text="整理控制")
+
+        # 1. 配置区域
+        frame_config = ttk.LabelFrame(self.tab_control, text="快捷设置", padding=10)
+        frame_config.pack(fill="x", padx=10, pady=5)
+        
+        self.var_dry_run = tk.BooleanVar()
+        dry_run = self.default_dry_run or self.core.cm.config.getboolean('SETTINGS', 'DRY_RUN', fallback=False)
+        self.var_dry_run.set(dry_run)
+            
+        ttk.Checkbutton(frame_config, text="预演模式 (只打印不移动)", variable=self.var_dry_run).grid(row=0, column=0, sticky="w", pady=5)
+
+        # 2. 操作区域
+        frame_action = ttk.Frame(self.tab_control, padding=10)
+        frame_action.pack(fill="x", padx=10)
+        
+        self.btn_organize = ttk.Button(frame_action, text="开始整理", command=self.start_organize)
+        self.btn_organize.pack(side="left", fill="x", expand=True, padx=5)
+        
+        self.btn_restore = ttk.Button(frame_action, text="一键还原", command=self.start_restore)
+        self.btn_restore.pack(side="left", fill="x", expand=True, padx=5)
+        
+        self.btn_export = ttk.Button(frame_action, text="导出日志", command=self.export_log)
+        self.btn_export.pack(side="left", fill="x", expand=True, padx=5)
+
+        # 3. 日志区域
+        frame_log = ttk.LabelFrame(self.tab_control, text="运行日志", padding=10)
+        frame_log.pack(fill="both", expand=True, padx=10, pady=5)
+        
+        self.text_log = scrolledtext.ScrolledText(frame_log, height=20, state='disabled')
+        self.text_log.pack(fill="both", expand=True)
+
+        # --- 标签页 2: 高级设置 ---
+        self.tab_settings = SettingsPanel(self.notebook, self.core.cm)
+        self.notebook.add(self.tab_settings, text="高级设置")
+
+    def log(self, message):
+        """GUI 日志回调"""
+        self.text_log.config(state='normal')
+        time_str = datetime.now().strftime('%H:%M:%S')
+        self.text_log.insert(tk.END, f"[{time_str}] {message}\n")
+        self.text_log.see(tk.END)
+        self.text_log.config(state='disabled')
+
+    def toggle_buttons(self, state):
+        for btn in [self.btn_organize, self.btn_restore, self.btn_export]:
+            btn.config(state=state)
+
+    def start_organize(self):
+        dry_run = self.var_dry_run.get()
+        self.toggle_buttons("disabled")
+        self.log("正在启动整理任务...")
+        
+        def task():
+            result = self.core.run_organize(dry_run=dry_run)
+            self.root.after(0, lambda: self.toggle_buttons("normal"))
+            if not result['success']:
+                self.log(f"错误: {result['message']}")
+                
+        threading.Thread(target=task, daemon=True).start()
+
+    def start_restore(self):
+        self.toggle_buttons("disabled")
+        self.log("正在启动还原任务...")
+        def task():
+            result = self.core.run_restore()
+            self.root.after(0, lambda: self.toggle_buttons("normal"))
+            if not result['success']:
+                self.log(f"错误: {result['message']}")
+                
+        threading.Thread(target=task, daemon=True).start()
+
+    def export_log(self):
+        path = self.core.export_log()
+        if path:
+            messagebox.showinfo("导出成功", f"日志已导出至:\n{path}")
+        else:
+            messagebox.showerror("导出失败", "导出日志时发生错误")
+
+    def on_close(self):
+        """窗口关闭时的清理"""
+        self.core.close()
+        self.root.destroy()